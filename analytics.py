@@ -0,0 +1,296 @@
+# Workout Progress Tracker — history analytics
+# Pure pandas/NumPy functions over the per-session aggregates the store keeps.
+# The app memoizes them against store.version(), so nothing here is recomputed
+# on a rerun unless the underlying data changed.
+
+import numpy as np
+import pandas as pd
+
+SESSION_COLUMNS = ["date", "day", "total_sets", "completed"]
+
+
+def session_table(day_counts, planned: dict[tuple[str, str], int], day_totals: dict[str, int]) -> pd.DataFrame:
+    """One row per (date, day) with its completion percentage.
+
+    `day_counts` are the store's (date, day, recorded, completed, program)
+    aggregates and `planned` maps (program ref, day key) to the planned set
+    count, so a session is measured against the version it was trained
+    under. Sessions with no known version fall back to `day_totals` (per day
+    key), then to the number of recorded sets.
+    """
+    df = pd.DataFrame(day_counts, columns=["date", "day", "recorded", "completed", "program"])
+    versions = pd.DataFrame([(*key, n) for key, n in planned.items()], columns=["program", "day", "planned"])
+    df = df.merge(versions, on=["program", "day"], how="left")
+    df["total_sets"] = df["planned"].fillna(df["day"].map(day_totals)).fillna(df["recorded"]).astype(int)
+    df = df[SESSION_COLUMNS]
+    df["completion_%"] = (df["completed"] / df["total_sets"]).round(3) * 100
+    return df
+
+
+_MONDAY = np.datetime64("1970-01-05", "D")
+
+
+def streaks(dates, today, per_week: int = 1) -> tuple[int, int]:
+    """(current, longest) runs of consecutive Monday-started weeks with at
+    least `per_week` training days in `dates`.
+
+    Rest days inside a week don't matter, only whether the week hit the
+    program's target. The week in progress counts once it has, and can't
+    end the current streak before it's over.
+    """
+    days = np.unique(np.asarray(dates, dtype="datetime64[D]"))
+    if days.size == 0:
+        return 0, 0
+    weeks, counts = np.unique((days - _MONDAY).astype(np.int64) // 7, return_counts=True)
+    hit = weeks[counts >= per_week]
+    if hit.size == 0:
+        return 0, 0
+    breaks = np.flatnonzero(np.diff(hit) != 1)
+    starts = np.r_[0, breaks + 1]
+    lengths = np.r_[breaks + 1, hit.size] - starts
+    gap = int((np.datetime64(today, "D") - _MONDAY).astype(np.int64) // 7 - hit[-1])
+    return (int(lengths[-1]) if gap <= 1 else 0), int(lengths.max())
+
+
+def completed_volume(sessions: pd.DataFrame, freq: str) -> pd.Series:
+    """Completed sets per calendar bucket, e.g. freq="W" (weekly) or "MS" (monthly)."""
+    by_date = sessions.set_index(pd.to_datetime(sessions["date"]))["completed"]
+    return by_date.resample(freq).sum().rename("completed_sets")
+
+
+def rolling_completion(sessions: pd.DataFrame, window: str = "28D") -> pd.DataFrame:
+    """Daily completion % and its time-based rolling mean."""
+    daily = sessions.groupby(pd.to_datetime(sessions["date"]))[["completed", "total_sets"]].sum()
+    pct = daily["completed"] / daily["total_sets"] * 100
+    return pd.DataFrame({
+        "completion_%": pct.round(1),
+        "rolling_%": pct.rolling(window, min_periods=1).mean().round(1),
+    })
+
+
+def exercise_adherence(ex_counts, sessions: pd.DataFrame, program) -> pd.DataFrame:
+    """Completed vs planned sets per exercise name, pooled across the program's days.
+
+    An exercise's planned sets are its per-session sets times the number of
+    recorded sessions of each day it appears in.
+    """
+    planned = pd.DataFrame(
+        [(key, i, ex.name, ex.sets) for key, day in program.days.items() for i, ex in enumerate(day.exercises)],
+        columns=["day", "ex", "exercise", "sets"],
+    )
+    planned["planned"] = planned["sets"] * planned["day"].map(sessions.groupby("day").size()).fillna(0).astype(int)
+    done = pd.DataFrame(ex_counts, columns=["day", "ex", "completed"])
+    merged = planned.merge(done, on=["day", "ex"], how="left")
+    merged["completed"] = merged["completed"].fillna(0).astype(int)
+
+    out = merged.groupby("exercise", sort=False).agg(
+        days=("day", "nunique"), planned=("planned", "sum"), completed=("completed", "sum")
+    )
+    out["adherence_%"] = (out["completed"] / out["planned"].where(out["planned"] > 0) * 100).round(1)
+    return out.reset_index()
+
+
+def history_report(sessions: pd.DataFrame, ex_counts, program, today) -> dict:
+    """Everything the Trends/Exercises tabs show, computed in one pass."""
+    # Parse dates once; the helpers below accept already-parsed columns.
+    sessions = sessions.assign(date=pd.to_datetime(sessions["date"], format="%Y-%m-%d"))
+    trained = sessions.loc[sessions["completed"] > 0, "date"].to_numpy(dtype="datetime64[D]")
+    current, longest = streaks(trained, today, program.per_week)
+    return {
+        "current_streak": current,
+        "longest_streak": longest,
+        # Over the whole history so a window's first days keep their lookback.
+        "rolling": rolling_completion(sessions),
+        "adherence": exercise_adherence(ex_counts, sessions, program),
+    }
+
+
+# ---------------------------------
+# Windowed views: what the Session Summary actually sends to the browser is
+# limited to a date range and to MAX_CHART_POINTS per chart, however long the
+# history gets.
+# ---------------------------------
+MAX_CHART_POINTS = 400
+BUCKET_NAMES = {"D": "day", "W": "week", "MS": "month", "QS": "quarter", "YS": "year"}
+
+
+def _fit_buckets(resample, freqs, max_points: int):
+    """resample(freq) for the finest of `freqs` giving at most max_points rows."""
+    for freq in freqs:
+        out = resample(freq)
+        if len(out) <= max_points:
+            break
+    return out, BUCKET_NAMES[freq]
+
+
+def lttb(x, y, n_out: int) -> np.ndarray:
+    """Indices of the points Largest-Triangle-Three-Buckets keeps out of len(x).
+
+    Keeps the first and last points and, from each of n_out - 2 equal
+    buckets in between, the point forming the largest triangle with the
+    previously kept point and the next bucket's average, which preserves
+    peaks and dips that plain striding would skip.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x, y = np.asarray(x, dtype=float), np.nan_to_num(np.asarray(y, dtype=float))
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    bounds = np.r_[edges, n]
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = bounds[b], bounds[b + 1]
+        avg_x, avg_y = x[bounds[b + 1]:bounds[b + 2]].mean(), y[bounds[b + 1]:bounds[b + 2]].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = keep[b + 1] = lo + int(area.argmax())
+    return keep
+
+
+def window_report(sessions: pd.DataFrame, report: dict, start, end, max_points: int = MAX_CHART_POINTS) -> dict:
+    """The Sessions/Trends tab data for [start, end], bounded to max_points per chart.
+
+    `sessions` is session_table()'s frame and `report` history_report()'s.
+    Bar charts are summed into the finest bucket (day, week, month, ...)
+    that fits; the rolling line keeps its shape through LTTB.
+    """
+    dates = pd.to_datetime(sessions["date"], format="%Y-%m-%d")
+    lo, hi = pd.Timestamp(start), pd.Timestamp(end)
+    in_window = (dates >= lo) & (dates <= hi)
+    window = sessions[in_window]
+
+    daily = window[["completed", "total_sets"]].groupby(dates[in_window]).sum()
+    if daily.empty:
+        completion, bucket = pd.Series(dtype=float, name="completion_%"), "day"
+    else:
+        sums, bucket = _fit_buckets(lambda f: daily.resample(f).sum(), ("D", "W", "MS", "QS", "YS"), max_points)
+        completion = (sums["completed"] / sums["total_sets"].where(sums["total_sets"] > 0) * 100).round(1).rename("completion_%")
+
+    dated = window.assign(date=dates[in_window])
+    weekly, weekly_bucket = _fit_buckets(lambda f: completed_volume(dated, f), ("W", "MS", "QS", "YS"), max_points)
+    monthly, monthly_bucket = _fit_buckets(lambda f: completed_volume(dated, f), ("MS", "QS", "YS"), max_points)
+
+    rolling = report["rolling"]
+    rolling = rolling[(rolling.index >= lo) & (rolling.index <= hi)]
+    if len(rolling) > max_points:
+        rolling = rolling.iloc[lttb(rolling.index.asi8, rolling["rolling_%"].to_numpy(), max_points)]
+
+    return {
+        "sessions": window.iloc[::-1].reset_index(drop=True),  # newest first, for paging
+        "completion": completion,
+        "completion_bucket": bucket,
+        "rolling": rolling,
+        "weekly": weekly,
+        "weekly_bucket": weekly_bucket,
+        "monthly": monthly,
+        "monthly_bucket": monthly_bucket,
+    }
+
+
+LOAD_COLUMNS = ["date", "day", "ex", "set", "weight", "reps"]
+
+
+def set_loads_frame(load_items) -> pd.DataFrame:
+    """One row per logged set, unpacked from the store's per-session arrays.
+
+    Each session's blobs are viewed with np.frombuffer and everything is
+    concatenated, so the only Python loop runs per session, never per set.
+    """
+    dates, days, sizes, weights, reps = [], [], [], [], []
+    for d_str, day, sizes_b, weights_b, reps_b in load_items:
+        n_sets = np.frombuffer(sizes_b, "<u2")
+        w, r = np.frombuffer(weights_b, "<f4"), np.frombuffer(reps_b, "<u2")
+        if w.size != n_sets.sum() or r.size != w.size:
+            continue  # damaged row; skip rather than misalign everything after it
+        dates.append(d_str)
+        days.append(day)
+        sizes.append(n_sets)
+        weights.append(w)
+        reps.append(r)
+    if not sizes:
+        return pd.DataFrame(columns=LOAD_COLUMNS)
+
+    per_session = np.array([s.sum() for s in sizes], dtype=np.int64)
+    blocks = np.concatenate(sizes).astype(np.int64)
+    ex = np.concatenate([np.arange(s.size) for s in sizes])
+    block_starts = np.cumsum(blocks) - blocks
+    df = pd.DataFrame({
+        "date": np.repeat(pd.to_datetime(dates, format="%Y-%m-%d").to_numpy(), per_session),
+        "day": pd.Categorical(np.repeat(np.array(days, dtype=object), per_session)),
+        "ex": np.repeat(ex, blocks),
+        "set": np.arange(blocks.sum()) - np.repeat(block_starts, blocks),
+        "weight": np.concatenate(weights).astype(np.float64),
+        "reps": np.concatenate(reps).astype(np.int64),
+    })
+    return df[(df["reps"] > 0) & df["weight"].notna()].reset_index(drop=True)
+
+
+def epley_1rm(weight, reps):
+    """Estimated one-rep max (Epley); a single rep is taken at face value."""
+    weight, reps = np.asarray(weight, dtype=float), np.asarray(reps, dtype=float)
+    return np.where(reps <= 1, weight, weight * (1 + reps / 30))
+
+
+def load_report(loads: pd.DataFrame, program) -> dict:
+    """Per-session volume, best estimated 1RM per session and PR sessions.
+
+    A PR is a session whose best e1RM beats every earlier session of the
+    same exercise; an exercise's first logged session only sets the bar.
+    This covers the whole history; window_loads() cuts out what is shown.
+    """
+    names = pd.DataFrame(
+        [(key, i, ex.name) for key, day in program.days.items() for i, ex in enumerate(day.exercises)],
+        columns=["day", "ex", "exercise"],
+    )
+    df = loads.assign(day=loads["day"].astype(str)).merge(names, on=["day", "ex"], how="left")
+    df["exercise"] = df["exercise"].fillna(df["day"] + " #" + (df["ex"] + 1).astype(str))
+    df["tonnage"] = df["weight"] * df["reps"]
+    df["e1rm"] = epley_1rm(df["weight"], df["reps"]).round(1)
+
+    sessions = df.groupby(["exercise", "date"]).agg(sets=("reps", "size"), reps=("reps", "sum"), tonnage=("tonnage", "sum"))
+
+    # The heaviest set (by e1RM) of every exercise in every session.
+    best = df.loc[df.groupby(["exercise", "date"])["e1rm"].idxmax(), ["date", "exercise", "weight", "reps", "e1rm"]]
+    best = best.sort_values(["exercise", "date"]).reset_index(drop=True)
+    previous = best.groupby("exercise")["e1rm"].cummax().groupby(best["exercise"]).shift()
+    prs = best[best["e1rm"] > previous].assign(previous_best=previous)
+
+    return {
+        "sessions": sessions.reset_index(),
+        # Long form: exercise names (e.g. "Warm-up: Treadmill") make poor chart columns.
+        "e1rm_trend": best[["date", "exercise", "e1rm"]],
+        "prs": prs.sort_values("date", ascending=False).reset_index(drop=True),
+    }
+
+
+def window_loads(report: dict, start, end, max_points: int = MAX_CHART_POINTS) -> dict:
+    """The Loads tab data for [start, end]: tonnage per exercise, the e1RM
+    trend with at most max_points points in all, and PRs newest first.
+
+    Each exercise's trend line gets an equal share of the points and is
+    reduced with LTTB; PRs still count every session before the range.
+    """
+    lo, hi = pd.Timestamp(start), pd.Timestamp(end)
+
+    def clip(frame: pd.DataFrame) -> pd.DataFrame:
+        return frame[(frame["date"] >= lo) & (frame["date"] <= hi)]
+
+    trend = clip(report["e1rm_trend"])
+    tonnage = clip(report["sessions"]).groupby("exercise").agg(
+        sets=("sets", "sum"), reps=("reps", "sum"), tonnage=("tonnage", "sum")
+    )
+    tonnage["best_e1rm"] = trend.groupby("exercise")["e1rm"].max()
+
+    share = max(3, max_points // max(trend["exercise"].nunique(), 1))
+    lines = []
+    for _, line in trend.groupby("exercise", sort=False):
+        if len(line) > share:
+            line = line.iloc[lttb(line["date"].to_numpy().astype(np.int64), line["e1rm"].to_numpy(), share)]
+        lines.append(line)
+
+    return {
+        "tonnage": tonnage.sort_values("tonnage", ascending=False).reset_index(),
+        "e1rm_trend": pd.concat(lines) if lines else trend,
+        "prs": clip(report["prs"]).reset_index(drop=True),
+    }
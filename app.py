@@ -2,12 +2,22 @@
 # Save as: app.py
 # Run with: streamlit run app.py
 
-import json
-from datetime import date
+import os
+from collections.abc import Callable
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import get_args, get_origin, get_type_hints
 
-import pandas as pd
 import streamlit as st
 
+import profiling
+from analytics import history_report, load_report, session_table, set_loads_frame, window_loads, window_report
+from plan import PlanCatalog
+from progress import DayLoads, DayProgress, load_keys, set_keys
+from store import open_store
+from transfer import EXPORT_FORMATS, ExportCache, import_progress
+from writebehind import WriteBehindStore
+
 # -----------------------
 # Page Config (no sidebar)
 # -----------------------
@@ -17,6 +27,9 @@ st.set_page_config(
     layout="wide",
 )
 
+# Opt-in section timing (TRACKER_PROFILE=1 or ?profile=1)
+prof = profiling.start()
+
 # =======================
 # Liquid Glass MAX THEME CSS (animations galore)
 # =======================
@@ -114,91 +127,277 @@ st.markdown(
     """,
     unsafe_allow_html=True,
 )
+prof.lap("css")
 
 # ---------------------------------
-# Structured 5-day workout program
+# Workout programs (plans/*.json, reloaded when a file changes)
 # ---------------------------------
-WORKOUT_PLAN = {
-    "Day 1 – Push (Chest, Shoulders, Triceps)": [
-        {"name": "Warm-up: Cycle", "sets": 1, "reps": "5 min"},
-        {"name": "Chest Press", "sets": 4, "reps": "10–12"},
-        {"name": "Incline Press", "sets": 4, "reps": "8–10"},
-        {"name": "Shoulder Press", "sets": 4, "reps": "10–12"},
-        {"name": "Pec Fly (machine)", "sets": 3, "reps": "12–15"},
-        {"name": "Dumbbell Lateral Raises", "sets": 3, "reps": "12–15"},
-        {"name": "Push-ups (burn-out)", "sets": 2, "reps": "Failure"},
-    ],
-    "Day 2 – Pull (Back, Biceps, Rear Delts)": [
-        {"name": "Warm-up: Cycle", "sets": 1, "reps": "5 min"},
-        {"name": "Lat Pulldown", "sets": 4, "reps": "8–12"},
-        {"name": "Seated Row", "sets": 4, "reps": "8–12"},
-        {"name": "Rear Delt Machine", "sets": 3, "reps": "12–15"},
-        {"name": "Dumbbell Bicep Curls", "sets": 3, "reps": "10–12"},
-        {"name": "Hammer Curls", "sets": 3, "reps": "10–12"},
-        {"name": "Face Pulls", "sets": 2, "reps": "12–15"},
-    ],
-    "Day 3 – Legs (Quads, Hamstrings, Glutes, Calves)": [
-        {"name": "Warm-up: Incline Walk", "sets": 1, "reps": "5 min"},
-        {"name": "Leg Press", "sets": 4, "reps": "10–12"},
-        {"name": "Leg Extension", "sets": 4, "reps": "12–15"},
-        {"name": "Leg Curl", "sets": 4, "reps": "12–15"},
-        {"name": "Hip Abductor", "sets": 3, "reps": "15–20"},
-        {"name": "Walking Lunges", "sets": 3, "reps": "12 each leg"},
-        {"name": "Standing Calf Raises", "sets": 3, "reps": "15–20"},
-    ],
-    "Day 4 – Push/Pull Hybrid (Upper Body Pump + Core)": [
-        {"name": "Warm-up: Cycle", "sets": 1, "reps": "5 min"},
-        {"name": "Incline Press", "sets": 4, "reps": "8–10"},
-        {"name": "Lat Pulldown", "sets": 4, "reps": "8–10"},
-        {"name": "Shoulder Press", "sets": 3, "reps": "10–12"},
-        {"name": "Seated Row", "sets": 3, "reps": "10–12"},
-        {"name": "Pec Fly", "sets": 3, "reps": "12–15"},
-        {"name": "Rear Delt Machine", "sets": 3, "reps": "12–15"},
-        {"name": "Planks / Hanging Knee Raises", "sets": 3, "reps": "30–60 sec"},
-    ],
-    "Day 5 – Conditioning + Full Body Burn": [
-        {"name": "Warm-up: Treadmill", "sets": 1, "reps": "5 min"},
-        {"name": "Dumbbell Thrusters", "sets": 3, "reps": "12"},
-        {"name": "Dumbbell Romanian Deadlift", "sets": 3, "reps": "12"},
-        {"name": "Push-ups", "sets": 3, "reps": "12–15"},
-        {"name": "Dumbbell Rows", "sets": 3, "reps": "12 each side"},
-        {"name": "Cycle Intervals", "sets": 10, "reps": "20s sprint / 40s easy"},
-        {"name": "Core Finisher (Russian Twists + Leg Raises)", "sets": 3, "reps": "15 each"},
-    ],
-}
-
-DAY_OPTIONS = list(WORKOUT_PLAN.keys())
-
-def set_key(d_str: str, day: str, ex_idx: int, set_idx: int) -> str:
-    return f"chk::{d_str}::{day}::ex{ex_idx}::set{set_idx}"
+HERE = os.path.dirname(os.path.abspath(__file__))
 
 
-def exercise_done_ratio(d_str: str, day: str):
-    total_sets, done_sets, full_exercises = 0, 0, 0
-    for i, ex in enumerate(WORKOUT_PLAN[day]):
-        sets = ex["sets"]
-        total_sets += sets
-        ex_done = True
-        for s in range(sets):
-            if st.session_state.get(set_key(d_str, day, i, s), False):
-                done_sets += 1
-            else:
-                ex_done = False
-        if ex_done:
-            full_exercises += 1
-    return total_sets, done_sets, full_exercises
+@st.cache_resource
+def get_catalog():
+    return PlanCatalog(os.environ.get("TRACKER_PLANS", os.path.join(HERE, "plans")))
+
+
+catalog = get_catalog()
+catalog.refresh()
+# TRACKER_PROGRAM picks the default program, e.g. "five-day-split" or a pinned
+# version "five-day-split@1"; the toolbar's program picker writes __program__.
+_pinned = os.environ.get("TRACKER_PROGRAM", "")
+_picked = st.session_state.get("__program__")
+program = catalog.get(_pinned if not _picked or _picked == _pinned.partition("@")[0] else _picked)
+DAY_OPTIONS = list(program.days)
+# Bit layout per day key across every program version, for stored history
+LAYOUTS = catalog.layouts()
+
+# ---------------------------------
+# Progress store (shared by every session in this process)
+# ---------------------------------
+DEFAULT_STORE = "sqlite:" + os.path.join(HERE, "workout_progress.db")
+
+
+@st.cache_resource
+def get_store():
+    # One pooled handle per process; every worker process opens the same file.
+    backend = open_store(os.environ.get("TRACKER_STORE", DEFAULT_STORE))
+    path = getattr(backend, "path", None)
+    if not path or os.environ.get("TRACKER_WRITE_BEHIND", "1") == "0":
+        return backend
+    # Ticks are journaled next to the database and written in the background.
+    return WriteBehindStore(backend, path + ".pending")
+
+
+def _auth_configured() -> bool:
+    try:
+        return "auth" in st.secrets
+    except Exception:  # no secrets file at all
+        return False
+
+
+def current_user() -> str:
+    """Whose progress this session shows.
+
+    With authentication configured ([auth] in secrets.toml) that's the
+    signed-in account, and visitors must log in first. Without it, it's
+    TRACKER_USER, or ?user=<name> if TRACKER_URL_USERS=1 opts in to
+    picking the account from the URL (trusted networks only). "" is the
+    shared single-user namespace.
+    """
+    if _auth_configured():
+        if not st.user.get("is_logged_in"):
+            st.info("Log in to see your workout progress.")
+            st.button("Log in", on_click=st.login)
+            st.stop()
+        return str(st.user.get("email") or st.user.get("sub") or "")
+    default = os.environ.get("TRACKER_USER", "")
+    if os.environ.get("TRACKER_URL_USERS", "0") not in ("", "0"):
+        return st.query_params.get("user", "") or default
+    return default
+
+
+store = get_store().for_user(current_user())
+
+# Another tab, session or worker process may have written this user's
+# progress since this session cached it, or the program may have changed;
+# drop the cached records if so.
+_stamp = (store.user, store.version(), program.ref, catalog.generation)
+if st.session_state.get("__progress_stamp__") != _stamp:
+    st.session_state.pop("__progress__", None)
+    st.session_state.pop("__loads__", None)
+    st.session_state["__progress_stamp__"] = _stamp
+
+
+def day_progress(d_str: str, day: str) -> DayProgress:
+    # Per-session cache of bitmask records, hydrated from the store once.
+    cache = st.session_state.setdefault("__progress__", {})
+    record = cache.get((d_str, day))
+    if record is None:
+        record = cache[(d_str, day)] = DayProgress.from_sets(program.days[day].layout, store.day_sets(d_str, day))
+    return record
+
+
+def day_loads(d_str: str, day: str) -> DayLoads:
+    # Per-session cache of weight/reps arrays, hydrated from the store once.
+    cache = st.session_state.setdefault("__loads__", {})
+    record = cache.get((d_str, day))
+    if record is None:
+        record = cache[(d_str, day)] = DayLoads.from_bytes(program.days[day].layout, store.day_loads(d_str, day))
+    return record
+
+
+@st.cache_resource(max_entries=2)
+def get_export_cache(_layouts, plans: int):
+    return ExportCache(_layouts)
+
+
+export_cache = get_export_cache(LAYOUTS, catalog.generation)
 
 
-def _safe_rerun():
+@st.cache_resource
+def deferred_downloads() -> bool:
+    # Newer Streamlit accepts a callable as download_button's data and only
+    # calls it when the button is clicked; older releases need the bytes on
+    # every run. Read once per process from the signature.
     try:
-        st.rerun()
-    except Exception:
-        st.experimental_rerun()
+        data_type = get_type_hints(st.download_button)["data"]
+    except (KeyError, NameError, TypeError):
+        return False
+    return any(get_origin(t) is Callable for t in get_args(data_type))
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def summary_table(_store, user: str, version: int, plans: int):
+    # Keyed by user, revision and plan files: reruns without new writes reuse the table.
+    return session_table(_store.day_counts(), catalog.planned_totals(), {day: layout.total for day, layout in LAYOUTS.items()})
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def history_analytics(_store, user: str, version: int, plans: int, program_ref: str, today: date):
+    sessions = summary_table(_store, user, version, plans)
+    return history_report(sessions, _store.exercise_counts(), program, today)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def summary_window(_store, user: str, version: int, plans: int, program_ref: str, today: date, start: date, end: date):
+    # Only the picked range, bounded per chart, is handed to st.dataframe/st.*_chart.
+    sessions = summary_table(_store, user, version, plans)
+    return window_report(sessions, history_analytics(_store, user, version, plans, program_ref, today), start, end)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_analytics(_store, user: str, version: int, plans: int, program_ref: str):
+    loads = set_loads_frame(_store.load_items())
+    return None if loads.empty else load_report(loads, program)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def loads_window(_store, user: str, version: int, plans: int, program_ref: str, start: date, end: date):
+    report = load_analytics(_store, user, version, plans, program_ref)
+    return None if report is None else window_loads(report, start, end)
+
+
+def exercise_done_ratio(d_str: str, day: str):
+    record = day_progress(d_str, day)
+    return record.layout.total, record.done, record.full
+
+
+def _persist_set(d_str: str, day: str, ex_idx: int, set_idx: int):
+    # Checkbox callback: the widget already holds the new value.
+    value = st.session_state[set_keys(d_str, day, program.days[day].layout.sizes)[ex_idx][set_idx]]
+    day_progress(d_str, day).set(ex_idx, set_idx, value)
+    # A new session is recorded under the program version picked here.
+    store.set_many([(d_str, day, ex_idx, set_idx, value)], program=program.ref)
+    st.session_state["__kpi_dirty__"] = True
+
+
+def _persist_load(d_str: str, day: str, ex_idx: int, set_idx: int):
+    # Weight/reps callback: store the session's whole arrays as one row.
+    w_key, r_key = load_keys(d_str, day, program.days[day].layout.sizes)[ex_idx][set_idx]
+    record = day_loads(d_str, day)
+    record.set(ex_idx, set_idx, st.session_state[w_key], st.session_state[r_key])
+    store.set_loads(d_str, day, *record.to_bytes())
+
+
+# ---------------------------------
+# Bulk actions: button callbacks that run before the rerun they trigger, so
+# each one is a single store write and needs no extra rerun.
+# ---------------------------------
+@contextmanager
+def bulk_update(msg: str):
+    # Runs before profiling.start(), so it's timed as a callback instead.
+    with profiling.callback("bulk_update"):
+        with store.batch(program=program.ref) as batch:
+            yield batch
+        # Keep this session's cached records in step with what was written.
+        cache = st.session_state.get("__progress__", {})
+        for d_str, day, ex_idx, set_idx, done in batch.rows():
+            record = cache.get((d_str, day))
+            # Older program versions may have had sets this layout doesn't.
+            if record is not None and ex_idx < len(record.layout.sizes) and set_idx < record.layout.sizes[ex_idx]:
+                record.set(ex_idx, set_idx, done)
+        st.session_state["__kpi_dirty__"] = True
+        st.session_state["__toast__"] = msg
+
+
+def _set_day(batch, d_str: str, day: str, value: bool, layout=None):
+    # Resets clear every set any version had; marking done only fills in
+    # the sets of the session's own version.
+    layout = layout or LAYOUTS.get(day)
+    for i, n in enumerate(layout.sizes if layout else ()):
+        for s in range(n):
+            batch.set(d_str, day, i, s, value)
+
+
+def mark_exercise(d_str: str, day: str, ex_idx: int, value: bool):
+    ex = program.days[day].exercises[ex_idx]
+    with bulk_update(f"{'Completed' if value else 'Reset'}: {ex.name}") as batch:
+        for s in range(ex.sets):
+            batch.set(d_str, day, ex_idx, s, value)
+
+
+def reset_selected_exercise(d_str: str, day: str, chosen: str):
+    if chosen == "All exercises":
+        st.session_state["__toast__"] = "Pick a single workout to reset."
+        return
+    mark_exercise(d_str, day, program.days[day].index[chosen], False)
+
+
+def reset_day(d_str: str, day: str):
+    with bulk_update(f"Cleared all sets for {day} on {d_str}") as batch:
+        _set_day(batch, d_str, day, False)
+
+
+def mark_range(start: date, end: date, value: bool, msg: str):
+    # Applies to every recorded session in the range, whichever plan day it was.
+    with bulk_update(msg) as batch:
+        for d_str, day, ref in store.sessions_between(start.isoformat(), end.isoformat()):
+            _set_day(batch, d_str, day, value, catalog.day_layout(ref, day) if value else None)
+
+
+def reset_week(d_str: str):
+    monday = date.fromisoformat(d_str) - timedelta(days=date.fromisoformat(d_str).weekday())
+    mark_range(monday, monday + timedelta(days=6), False, f"Cleared the week of {monday.isoformat()}")
+
+
+def mark_range_from_widget(value: bool):
+    picked = st.session_state.get("__bulk_range__") or ()
+    if len(picked) != 2:
+        st.session_state["__toast__"] = "Pick a start and an end date first."
+        return
+    verb = "Completed" if value else "Cleared"
+    mark_range(picked[0], picked[1], value, f"{verb} all sessions from {picked[0]} to {picked[1]}")
+
+
+def copy_previous_session(d_str: str, day: str):
+    source = store.latest_session(day, d_str)
+    if source is None:
+        st.session_state["__toast__"] = "No earlier session of this day to copy."
+        return
+    recorded = store.day_sets(source, day)
+    with bulk_update(f"Copied {source} into {d_str}") as batch:
+        for i, n in enumerate(program.days[day].layout.sizes):
+            for s in range(n):
+                batch.set(d_str, day, i, s, recorded.get((i, s), False))
+
+
+# Partial-update mode: each exercise card is a fragment, so ticking a set
+# reruns that card (and the KPI row) instead of the whole script.
+# TRACKER_FRAGMENTS=0 falls back to full reruns.
+if os.environ.get("TRACKER_FRAGMENTS", "1") != "0":
+    _fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+else:
+    _fragment = None
+_fragment = _fragment or (lambda func: func)
+
+prof.lap("setup")
 
 # ==============
 # App Header
 # ==============
 st.markdown('<div class="glass app-header"><h1 class="app-title">Workout Progress Tracker</h1><p class="app-sub">Liquid glass · Animated UI · No sidebar · Compact, colorful controls.</p></div>', unsafe_allow_html=True)
+if store.user:
+    st.caption(f"Tracking progress for **{store.user}**")
 
 # Top sticky toolbar (no sidebar)
 with st.container():
@@ -208,168 +407,284 @@ with st.container():
     with c1:
         selected_date = st.date_input("Training Date", value=date.today(), format="YYYY-MM-DD")
         date_str = selected_date.isoformat()
+        if len(catalog.names()) > 1:
+            st.selectbox("Program", catalog.names(), index=catalog.names().index(program.name), key="__program__")
     with c2:
-        day_short = ["Day 1", "Day 2", "Day 3", "Day 4", "Day 5"]
-        default_idx = 0 if "__day_idx__" not in st.session_state else st.session_state["__day_idx__"]
-        idx = st.selectbox("Day", options=list(range(5)), format_func=lambda i: day_short[i], index=default_idx, key="__select_day__")
+        day_short = [d.short for d in program.days.values()]
+        default_idx = st.session_state.get("__day_idx__", 0)
+        if default_idx >= len(DAY_OPTIONS):
+            # The program changed under us and has fewer days.
+            default_idx = 0
+            st.session_state.pop("__select_day__", None)
+        idx = st.selectbox("Day", options=list(range(len(DAY_OPTIONS))), format_func=lambda i: day_short[i], index=default_idx, key="__select_day__")
         st.session_state["__day_idx__"] = idx
         day = DAY_OPTIONS[idx]
+        plan_day = program.days[day]
     with c3:
-        ex_names = [ex["name"] for ex in WORKOUT_PLAN[day]]
-        chosen = st.selectbox("Workout", ["All exercises"] + ex_names, key=f"__ex_select_{idx}")
+        chosen = st.selectbox("Workout", ("All exercises", *plan_day.names), key=f"__ex_select_{program.name}_{idx}")
+        log_loads = st.toggle("Log weight & reps", key="__log_loads__")
     with c4:
         with st.expander("☁️ Sync & Reset", expanded=False):
-            export_data = {k: v for k, v in st.session_state.items() if isinstance(v, bool) and k.startswith("chk::")}
-            if export_data:
-                st.download_button(
-                    "Export progress (JSON)",
-                    data=json.dumps(export_data, indent=2),
-                    file_name="workout_progress.json",
-                    mime="application/json",
-                    use_container_width=True,
-                )
-            else:
+            # Exports are built only when the download is clicked, then cached
+            # per store revision. The revision alone tells whether anything
+            # was ever written, without scanning sessions or flushing queued
+            # writes on every rerun.
+            if store.version() == 0:
                 st.caption("No progress yet to export.")
+            else:
+                export_format = st.selectbox("Export format", list(EXPORT_FORMATS), key="__export_format__")
+                fmt = EXPORT_FORMATS[export_format]
+                # Deferred: the export is built only when the button is clicked.
+                data = (lambda: export_cache.get(store, export_format)) if deferred_downloads() else export_cache.get(store, export_format)
+                st.download_button(f"Export progress ({export_format})", data=data, file_name=fmt.file_name, mime=fmt.mime, use_container_width=True)
 
-            uploaded = st.file_uploader("Import progress JSON", type=["json"], help="Merges into current session")
+            uploaded = st.file_uploader("Import progress JSON", type=["json", "ndjson", "jsonl", "gz"], help="Merges into your saved progress")
             if uploaded is not None:
-                try:
-                    incoming = json.load(uploaded)
-                    if isinstance(incoming, dict):
-                        for k, v in incoming.items():
-                            if isinstance(v, bool) and k.startswith("chk::"):
-                                st.session_state[k] = v
-                        st.success("Imported progress. If you don't see updates, change a control to refresh.")
-                    else:
-                        st.error("Invalid file structure.")
-                except Exception as e:
-                    st.error(f"Import failed: {e}")
+                # The uploader hands the same file back on every rerun; import it
+                # once and just repeat the outcome afterwards.
+                outcomes = st.session_state.setdefault("__imports__", {})
+                file_id = getattr(uploaded, "file_id", None) or f"{uploaded.name}:{uploaded.size}"
+                if file_id not in outcomes:
+                    bar = st.progress(0.0, text="Importing…")
+                    try:
+                        result = import_progress(
+                            store, uploaded, LAYOUTS, size=uploaded.size, program=program.ref,
+                            on_progress=lambda f: bar.progress(f, text=f"Importing… {int(f * 100)}%"),
+                        )
+                        if result.duplicate:
+                            outcomes[file_id] = ("info", "This file has already been imported.")
+                        else:
+                            st.session_state.pop("__progress__", None)
+                            skipped = f" ({result.rejected} invalid entries skipped)" if result.rejected else ""
+                            outcomes[file_id] = ("success", f"Imported {result.rows} sets{skipped}.")
+                    except Exception as e:
+                        outcomes[file_id] = ("error", f"Import failed: {e}")
+                    bar.empty()
+                level, msg = outcomes[file_id]
+                getattr(st, level)(msg)
 
             st.markdown("---")
             colA, colB = st.columns(2)
             with colA:
-                if st.button("🔁 Reset selected exercise", use_container_width=True):
-                    if chosen != "All exercises":
-                        eidx = ex_names.index(chosen)
-                        st.session_state["__pending_action__"] = {"type": "exercise", "date": date_str, "day": day, "ex_idx": eidx, "value": False, "msg": f"Reset: {chosen}"}
-                        _safe_rerun()
-                    else:
-                        st.info("Pick a single workout to reset.")
+                st.button("🔁 Reset selected exercise", use_container_width=True, on_click=reset_selected_exercise, args=(date_str, day, chosen))
             with colB:
-                if st.button("🧹 Reset this day", use_container_width=True):
-                    st.session_state["__pending_action__"] = {"type": "day", "date": date_str, "day": day, "value": False, "msg": f"Cleared all sets for {day} on {date_str}"}
-                    _safe_rerun()
+                st.button("🧹 Reset this day", use_container_width=True, on_click=reset_day, args=(date_str, day))
+
+            colC, colD = st.columns(2)
+            with colC:
+                st.button(f"📋 Copy last {day_short[idx]} session", use_container_width=True, on_click=copy_previous_session, args=(date_str, day))
+            with colD:
+                st.button("🗓️ Reset this week", use_container_width=True, on_click=reset_week, args=(date_str,))
+
+            st.date_input("Bulk edit range", value=(selected_date - timedelta(days=6), selected_date), format="YYYY-MM-DD", key="__bulk_range__")
+            colE, colF = st.columns(2)
+            with colE:
+                st.button("✅ Mark range done", use_container_width=True, on_click=mark_range_from_widget, args=(True,))
+            with colF:
+                st.button("♻️ Reset range", use_container_width=True, on_click=mark_range_from_widget, args=(False,))
 
     st.markdown('</div></div>', unsafe_allow_html=True)
+prof.lap("toolbar")
 
-# Apply any deferred actions BEFORE rendering widgets below
-action = st.session_state.pop("__pending_action__", None)
-if action:
-    if action["type"] == "exercise":
-        ex = WORKOUT_PLAN[action["day"]][action["ex_idx"]]
-        for s in range(ex["sets"]):
-            st.session_state[set_key(action["date"], action["day"], action["ex_idx"], s)] = action["value"]
-        st.toast(action.get("msg", "Updated"))
-    elif action["type"] == "day":
-        for i, ex in enumerate(WORKOUT_PLAN[action["day"]]):
-            for s in range(ex["sets"]):
-                st.session_state[set_key(action["date"], action["day"], i, s)] = action["value"]
-        st.toast(action.get("msg", "Updated"))
+# Feedback from bulk-action callbacks
+toast = st.session_state.pop("__toast__", None)
+if toast:
+    st.toast(toast)
 
 # ==============
 # KPI Row
 # ==============
-T, D, E = exercise_done_ratio(date_str, day)
-pct = int((D / T * 100) if T else 0)
+def render_kpis(d_str: str, day: str):
+    plan_day = program.days[day]
+    T, D, E = exercise_done_ratio(d_str, day)
+    pct = int((D / T * 100) if T else 0)
+
+    k1, k2, k3, k4 = st.columns([1,1,1,1])
+    with k1:
+        st.markdown('<div class="glass kpi"><h3>DAY</h3><p>'+plan_day.short+'</p></div>', unsafe_allow_html=True)
+    with k2:
+        st.markdown(f'<div class="glass kpi"><h3>COMPLETED SETS</h3><p>{D} / {T}</p></div>', unsafe_allow_html=True)
+    with k3:
+        st.markdown(f'<div class="glass kpi"><h3>COMPLETION</h3><p>{pct}%</p></div>', unsafe_allow_html=True)
+    with k4:
+        st.markdown(f'<div class="glass kpi"><h3>EXERCISES DONE</h3><p>{E} / {len(plan_day.exercises)}</p></div>', unsafe_allow_html=True)
 
-k1, k2, k3, k4 = st.columns([1,1,1,1])
-with k1:
-    st.markdown('<div class="glass kpi"><h3>DAY</h3><p>'+day.split('–')[0].strip()+'</p></div>', unsafe_allow_html=True)
-with k2:
-    st.markdown(f'<div class="glass kpi"><h3>COMPLETED SETS</h3><p>{D} / {T}</p></div>', unsafe_allow_html=True)
-with k3:
-    st.markdown(f'<div class="glass kpi"><h3>COMPLETION</h3><p>{pct}%</p></div>', unsafe_allow_html=True)
-with k4:
-    st.markdown(f'<div class="glass kpi"><h3>EXERCISES DONE</h3><p>{E} / {len(WORKOUT_PLAN[day])}</p></div>', unsafe_allow_html=True)
+    st.progress(pct / 100 if T else 0.0, text=f"{pct}% complete")
 
-st.progress(pct / 100 if T else 0.0, text=f"{pct}% complete")
+
+# A card toggle only reruns its own fragment, which redraws the KPIs in here.
+kpi_slot = st.empty()
+st.session_state.pop("__kpi_dirty__", None)
+with kpi_slot.container():
+    render_kpis(date_str, day)
+
+prof.lap("kpis")
 
 st.markdown("<div class='block-gap'></div>", unsafe_allow_html=True)
 
 # ==========================
 # Tracker: compact grid cards (unchanged functionality)
 # ==========================
-render_all = chosen == "All exercises"
-exercises = WORKOUT_PLAN[day]
+@_fragment
+def render_card(d_str: str, day: str, i: int, kpi_slot, log_loads: bool):
+    plan_day = program.days[day]
+    ex = plan_day.exercises[i]
+    record = day_progress(d_str, day)
+    loads = day_loads(d_str, day) if log_loads else None
+
+    st.markdown('<div class="glass card">', unsafe_allow_html=True)
+    top_l, top_r = st.columns([3,1])
+    with top_l:
+        st.markdown(f"<h4>{ex.name}</h4>", unsafe_allow_html=True)
+        st.markdown(f"<span class='tag'>Sets: {ex.sets}</span> <span class='tag'>Target: {ex.reps}</span>", unsafe_allow_html=True)
+    with top_r:
+        all_done = record.exercise_done(i)
+        st.markdown(f"<p class='muted' style='text-align:right'>{'✅ All done' if all_done else '⏳ In progress'}</p>", unsafe_allow_html=True)
+
+    st.markdown('<div class="hr"></div>', unsafe_allow_html=True)
+
+    # Sync widget keys from the store and show set pills
+    st.markdown('<div class="set-grid">', unsafe_allow_html=True)
+    for s, key in enumerate(set_keys(d_str, day, plan_day.layout.sizes)[i]):
+        st.session_state[key] = record.is_done(i, s)
+        with st.container():
+            st.markdown('<div class="set-pill">', unsafe_allow_html=True)
+            st.checkbox(f"Set {s+1}", key=key, on_change=_persist_set, args=(d_str, day, i, s))
+            if loads is not None:
+                w_key, r_key = load_keys(d_str, day, plan_day.layout.sizes)[i][s]
+                st.session_state[w_key], st.session_state[r_key] = loads.get(i, s)
+                w_col, r_col = st.columns(2)
+                w_col.number_input("Weight", min_value=0.0, step=2.5, value=None, placeholder="kg", key=w_key,
+                                   label_visibility="collapsed", on_change=_persist_load, args=(d_str, day, i, s))
+                r_col.number_input("Reps", min_value=0, step=1, value=None, placeholder="reps", key=r_key,
+                                   label_visibility="collapsed", on_change=_persist_load, args=(d_str, day, i, s))
+            st.markdown('</div>', unsafe_allow_html=True)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    # Buttons (callbacks write before the fragment reruns)
+    b1, b2 = st.columns([1,1])
+    with b1:
+        st.button("Mark all done", key=f"done_{day}_{i}", use_container_width=True, on_click=mark_exercise, args=(d_str, day, i, True))
+    with b2:
+        st.button("Reset", key=f"reset_{day}_{i}", use_container_width=True, on_click=mark_exercise, args=(d_str, day, i, False))
+
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    # Fragment rerun after a tick: refresh the KPI row from the bitmask counters
+    if st.session_state.pop("__kpi_dirty__", False):
+        profiling.note("fragment_reruns")
+        with kpi_slot.container():
+            render_kpis(d_str, day)
+        toast = st.session_state.pop("__toast__", None)
+        if toast:
+            st.toast(toast)
+
+
+# One indexed lookup for a single workout instead of scanning every exercise
+if chosen == "All exercises":
+    card_indexes = range(len(plan_day.exercises))
+else:
+    card_indexes = (plan_day.index[chosen],)
 
 cols = st.columns(2, gap="small")
 
-for i, ex in enumerate(exercises):
-    if (not render_all) and (ex["name"] != chosen):
-        continue
-
-    col = cols[i % 2]
-    with col:
-        st.markdown('<div class="glass card">', unsafe_allow_html=True)
-        top_l, top_r = st.columns([3,1])
-        with top_l:
-            st.markdown(f"<h4>{ex['name']}</h4>", unsafe_allow_html=True)
-            st.markdown(f"<span class='tag'>Sets: {ex['sets']}</span> <span class='tag'>Target: {ex['reps']}</span>", unsafe_allow_html=True)
-        with top_r:
-            all_done = all(st.session_state.get(set_key(date_str, day, i, s), False) for s in range(ex["sets"]))
-            st.markdown(f"<p class='muted' style='text-align:right'>{'✅ All done' if all_done else '⏳ In progress'}</p>", unsafe_allow_html=True)
-
-        st.markdown('<div class="hr"></div>', unsafe_allow_html=True)
-
-        # Initialize keys and show set pills
-        st.markdown('<div class="set-grid">', unsafe_allow_html=True)
-        for s in range(ex["sets"]):
-            key = set_key(date_str, day, i, s)
-            if key not in st.session_state:
-                st.session_state[key] = False
-            with st.container():
-                st.markdown('<div class="set-pill">', unsafe_allow_html=True)
-                st.checkbox(f"Set {s+1}", key=key)
-                st.markdown('</div>', unsafe_allow_html=True)
-        st.markdown('</div>', unsafe_allow_html=True)
-
-        # Buttons (defer mutations)
-        b1, b2 = st.columns([1,1])
-        with b1:
-            if st.button("Mark all done", key=f"done_{idx}_{i}", use_container_width=True):
-                st.session_state["__pending_action__"] = {"type":"exercise","date":date_str,"day":day,"ex_idx":i,"value":True,"msg":f"Completed: {ex['name']}"}
-                _safe_rerun()
-        with b2:
-            if st.button("Reset", key=f"reset_{idx}_{i}", use_container_width=True):
-                st.session_state["__pending_action__"] = {"type":"exercise","date":date_str,"day":day,"ex_idx":i,"value":False,"msg":f"Reset: {ex['name']}"}
-                _safe_rerun()
-
-        st.markdown('</div>', unsafe_allow_html=True)
+for i in card_indexes:
+    with cols[i % 2]:
+        render_card(date_str, day, i, kpi_slot, log_loads)
+
+prof.lap("cards")
 
 # ==========================
 # Session Summary (optional)
 # ==========================
-with st.expander("📈 Session Summary"):
-    summary = []
-    for k, v in st.session_state.items():
-        if isinstance(v, bool) and k.startswith("chk::"):
-            try:
-                _, dstr, dday, rest = k.split("::", 3)
-            except ValueError:
-                continue
-            summary.append((dstr, dday, v))
-
-    if not summary:
-        st.info("No data yet. Check off a few sets to populate progress.")
-    else:
-        df = (
-            pd.DataFrame(summary, columns=["date", "day", "done"])\
-              .groupby(["date", "day"]).agg(total_sets=("done", "size"), completed=("done", "sum"))
-              .reset_index()
-        )
-        df["completion_%"] = (df["completed"] / df["total_sets"]).round(3) * 100
-        st.dataframe(df, use_container_width=True)
-        st.bar_chart(df.set_index("date")["completion_%"], use_container_width=True)
+# Only build the summary while the expander is open (older Streamlit versions
+# can't report that, so they always build it). The table is paged and the
+# charts cover a picked date range, so a long history doesn't mean a
+# long payload.
+SUMMARY_DAYS = 90  # default range, ending at the latest session
+PAGE_SIZE = 50     # table rows per page
+
+
+def paged_table(rows, key: str, window: tuple, noun: str):
+    # One page of `rows` (newest first); back to the first page whenever
+    # the range changes.
+    pages = max(1, -(-len(rows) // PAGE_SIZE))
+    page = 1
+    if pages > 1:
+        if st.session_state.get(f"{key}_for") != window or st.session_state.get(key, 1) > pages:
+            st.session_state[key] = 1
+        st.session_state[f"{key}_for"] = window
+        page = st.number_input("Page", min_value=1, max_value=pages, step=1, key=key)
+    shown = rows.iloc[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+    st.dataframe(shown, use_container_width=True, hide_index=True)
+    if len(rows):
+        st.caption(f"{noun} {(page - 1) * PAGE_SIZE + 1}–{(page - 1) * PAGE_SIZE + len(shown)} of {len(rows)}, newest first")
+
+try:
+    summary_box = st.expander("📈 Session Summary", key="__summary_open__", on_change="rerun")
+except TypeError:
+    summary_box = st.expander("📈 Session Summary")
+
+with summary_box:
+    if getattr(summary_box, "open", True) is not False:
+        version = store.version()
+        df = summary_table(store, store.user, version, catalog.generation)
+        if df.empty:
+            st.info("No data yet. Check off a few sets to populate progress.")
+        else:
+            first, last = date.fromisoformat(df["date"].min()), date.fromisoformat(df["date"].max())
+            default = (max(first, last - timedelta(days=SUMMARY_DAYS - 1)), last)
+            picked = st.session_state.get("__summary_range__")
+            # The default range moves forward with new sessions; a range the
+            # user picked stays put unless it no longer fits the history.
+            if (
+                not picked
+                or tuple(picked) == st.session_state.get("__summary_default__")
+                or not all(first <= d <= last for d in picked)
+            ):
+                st.session_state["__summary_range__"] = default
+            st.session_state["__summary_default__"] = default
+            picked = st.date_input("Date range", min_value=first, max_value=last, format="YYYY-MM-DD", key="__summary_range__")
+            # Halfway through picking a range there is only a start date.
+            start, end = (tuple(picked) * 2)[:2]
+            view = summary_window(store, store.user, version, catalog.generation, program.ref, date.today(), start, end)
+
+            tab_sessions, tab_trends, tab_exercises, tab_loads = st.tabs(["Sessions", "Trends", "Exercises", "Loads"])
+            with tab_sessions:
+                paged_table(view["sessions"], "__summary_page__", (start, end), "Sessions")
+                st.caption(f"Completion % per {view['completion_bucket']}")
+                st.bar_chart(view["completion"], use_container_width=True)
+            report = history_analytics(store, store.user, version, catalog.generation, program.ref, date.today())
+            with tab_trends:
+                s1, s2 = st.columns(2)
+                s1.metric("Current streak", f"{report['current_streak']} weeks")
+                s2.metric("Longest streak", f"{report['longest_streak']} weeks")
+                st.caption(f"A streak week has at least {program.per_week} training days.")
+                st.caption("Completion % (daily, 28-day rolling mean)")
+                st.line_chart(view["rolling"], use_container_width=True)
+                v1, v2 = st.columns(2)
+                with v1:
+                    st.caption(f"Completed sets per {view['weekly_bucket']}")
+                    st.bar_chart(view["weekly"], use_container_width=True)
+                with v2:
+                    st.caption(f"Completed sets per {view['monthly_bucket']}")
+                    st.bar_chart(view["monthly"], use_container_width=True)
+            with tab_exercises:
+                st.dataframe(report["adherence"], use_container_width=True, hide_index=True)
+            with tab_loads:
+                loads_view = loads_window(store, store.user, version, catalog.generation, program.ref, start, end)
+                if loads_view is None:
+                    st.info("No weights logged yet. Turn on “Log weight & reps” to record them per set.")
+                else:
+                    st.caption("Best estimated 1RM per session (Epley)")
+                    st.line_chart(loads_view["e1rm_trend"], x="date", y="e1rm", color="exercise", use_container_width=True)
+                    st.caption("Tonnage per exercise")
+                    st.dataframe(loads_view["tonnage"], use_container_width=True, hide_index=True)
+                    st.caption("Personal records")
+                    paged_table(loads_view["prs"], "__prs_page__", (start, end), "Records")
+
+prof.lap("summary")
+prof.finish()
 
 # ---------------
 # End of script
@@ -0,0 +1,262 @@
+# Workout Progress Tracker — headless rerun-latency benchmark
+# Drives app.py through Streamlit's AppTest against synthetic histories and
+# writes machine-readable results, so storage/rendering changes can be
+# compared before and after.
+#
+# Run with:  python bench.py --months 1 12 60 --out bench_results.json
+# Compare:   python bench.py --compare old.json new.json
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(HERE, "app.py")
+sys.path.insert(0, HERE)
+
+import streamlit as st  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from plan import PlanCatalog  # noqa: E402
+from store import open_store  # noqa: E402
+from transfer import EXPORT_FORMATS, ExportCache, import_progress  # noqa: E402
+
+
+def load_catalog() -> PlanCatalog:
+    # The same plans directory (and default program) the app uses.
+    return PlanCatalog(os.environ.get("TRACKER_PLANS", os.path.join(HERE, "plans")))
+
+
+def seed_history(store, program, months: int, seed: int = 0) -> int:
+    """Five training days a week cycling through the plan, ~80% of sets done.
+
+    Ends yesterday, so today's session (the one the app opens on) is empty.
+    """
+    rng = random.Random(seed)
+    days = list(program.days.values())
+    rows, trained = [], 0
+    start = date.today() - timedelta(days=months * 30)
+    for offset in range(months * 30):
+        current = start + timedelta(days=offset)
+        if current.weekday() >= 5:
+            continue
+        day = days[trained % len(days)]
+        trained += 1
+        d_str = current.isoformat()
+        for ex_idx, n in enumerate(day.layout.sizes):
+            for set_idx in range(n):
+                rows.append((d_str, day.key, ex_idx, set_idx, rng.random() < 0.8))
+    store.set_many(rows, program=program.ref)
+    return len(rows)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+def _timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def _summary(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "median_ms": _ms(statistics.median(ordered)),
+        "p95_ms": _ms(ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]),
+        "max_ms": _ms(ordered[-1]),
+        "n": len(ordered),
+    }
+
+
+def _check(at: AppTest) -> AppTest:
+    if at.exception:
+        raise RuntimeError(f"app raised: {at.exception[0].value}")
+    return at
+
+
+def _button(at: AppTest, label: str):
+    return next(b for b in at.button if b.label == label)
+
+
+def _clear_caches():
+    # AppTest runs in-process, so cache_resource would otherwise hand the next
+    # history size the previous store.
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+
+def run_app_scenarios(repeat: int) -> dict:
+    _clear_caches()
+    at = AppTest.from_file(APP, default_timeout=120)
+    cold = _timed(lambda: _check(at.run()))
+    warm = [_timed(lambda: _check(at.run())) for _ in range(repeat)]
+
+    keys = [cb.key for cb in at.checkbox if cb.key and cb.key.startswith("chk::")]
+    toggles = []
+    for i in range(repeat):
+        key = keys[i % len(keys)]
+        toggles.append(_timed(lambda: _check(at.checkbox(key=key).check().run())))
+        toggles.append(_timed(lambda: _check(at.checkbox(key=key).uncheck().run())))
+
+    mark_all = [_timed(lambda: _check(_button(at, "Mark all done").click().run())) for _ in range(repeat)]
+    reset_day = [_timed(lambda: _check(_button(at, "🧹 Reset this day").click().run())) for _ in range(repeat)]
+
+    at.session_state["__summary_open__"] = True
+    summary_first = _timed(lambda: _check(at.run()))
+    summary_cached = [_timed(lambda: _check(at.run())) for _ in range(repeat)]
+    summary_range = at.date_input(key="__summary_range__")
+    summary_range.set_value((summary_range.min, summary_range.max))
+    summary_full_range = _timed(lambda: _check(at.run()))
+
+    return {
+        "cold_start_ms": _ms(cold),
+        "warm_rerun": _summary(warm),
+        "toggle_rerun": _summary(toggles),
+        "mark_all_done": _summary(mark_all),
+        "reset_day": _summary(reset_day),
+        "summary_first_open_ms": _ms(summary_first),
+        "summary_cached_rerun": _summary(summary_cached),
+        "summary_full_range_ms": _ms(summary_full_range),
+    }
+
+
+def run_transfer(store, layouts: dict) -> dict:
+    results = {}
+    cache = ExportCache(layouts, max_entries=len(EXPORT_FORMATS))
+    exports = {}
+    for fmt in EXPORT_FORMATS:
+        elapsed = _timed(lambda: exports.__setitem__(fmt, cache.get(store, fmt)))
+        results[f"export {fmt}"] = {"ms": _ms(elapsed), "bytes": len(exports[fmt])}
+    for fmt in ("JSON (per set)", "NDJSON (gzip)"):
+        target = open_store("memory:")
+        elapsed = _timed(lambda: import_progress(target, io.BytesIO(exports[fmt]), layouts))
+        results[f"import {fmt}"] = {"ms": _ms(elapsed), "bytes": len(exports[fmt])}
+    return results
+
+
+def peak_memory() -> float:
+    _clear_caches()
+    tracemalloc.start()
+    at = _check(AppTest.from_file(APP, default_timeout=120).run())
+    key = next(cb.key for cb in at.checkbox if cb.key and cb.key.startswith("chk::"))
+    _check(at.checkbox(key=key).check().run())
+    at.session_state["__summary_open__"] = True
+    _check(at.run())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(peak / 2**20, 2)
+
+
+def bench(months_list: list[int], repeat: int) -> list[dict]:
+    catalog = load_catalog()
+    program = catalog.get(os.environ.get("TRACKER_PROGRAM"))
+    layouts = catalog.layouts()
+    results = []
+    for months in months_list:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            store = open_store(f"sqlite:{path}")
+            seed_start = time.perf_counter()
+            n_rows = seed_history(store, program, months)
+            seed_time = time.perf_counter() - seed_start
+
+            os.environ["TRACKER_STORE"] = f"sqlite:{path}"
+            entry = {
+                "months": months,
+                "set_rows": n_rows,
+                "sessions": len(store.day_counts()),
+                "seed_ms": _ms(seed_time),
+                "app": run_app_scenarios(repeat),
+                "transfer": run_transfer(store, layouts),
+                "peak_memory_mib": peak_memory(),
+            }
+            _clear_caches()
+            store.close()
+        results.append(entry)
+        print(
+            f"{months:>3} months  {n_rows:>7} sets  cold {entry['app']['cold_start_ms']:>8.1f} ms  "
+            f"toggle {entry['app']['toggle_rerun']['median_ms']:>7.1f} ms  "
+            f"peak {entry['peak_memory_mib']:>7.1f} MiB",
+            file=sys.stderr,
+        )
+    return results
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _flatten(prefix: str, value, out: dict):
+    if isinstance(value, dict):
+        for k, v in value.items():
+            _flatten(f"{prefix}.{k}" if prefix else k, v, out)
+    elif isinstance(value, (int, float)) and prefix.endswith(("_ms", ".ms", "_mib")):
+        out[prefix] = value
+
+
+def compare(old_path: str, new_path: str) -> None:
+    with open(old_path, encoding="utf-8") as fh:
+        old = {r["months"]: r for r in json.load(fh)["results"]}
+    with open(new_path, encoding="utf-8") as fh:
+        new = {r["months"]: r for r in json.load(fh)["results"]}
+    for months in sorted(old.keys() & new.keys()):
+        before, after = {}, {}
+        _flatten("", old[months], before)
+        _flatten("", new[months], after)
+        print(f"== {months} months")
+        for metric in sorted(before.keys() & after.keys()):
+            a, b = before[metric], after[metric]
+            change = f"{(b - a) / a * 100:+7.1f}%" if a else "    n/a"
+            print(f"  {metric:<45} {a:>10.2f} -> {b:>10.2f}  {change}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless rerun-latency benchmark for app.py")
+    parser.add_argument("--months", type=int, nargs="+", default=[1, 12, 60], help="history sizes to seed")
+    parser.add_argument("--repeat", type=int, default=5, help="samples per interactive scenario")
+    parser.add_argument("--out", default="bench_results.json", help="where to write the JSON results")
+    parser.add_argument("--label", help="free-form label stored with the results, e.g. a branch name")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="diff two result files and exit")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = bench(args.months, args.repeat)
+    doc = {
+        "meta": {
+            "label": args.label,
+            "git_revision": _git_revision(),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "streamlit": st.__version__,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as fh:
+        json.dump(doc, fh, indent=2)
+    print(f"wrote {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
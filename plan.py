@@ -0,0 +1,230 @@
+# Workout Progress Tracker — workout programs
+# Programs live in plans/*.json (or *.yaml / *.yml with PyYAML installed),
+# one program version per file. Each file is parsed once into a Program with
+# its lookups precomputed and is only re-read when its mtime or size changes.
+#
+# Progress rows are keyed by day key and exercise position, so a new version
+# of a program keeps its history as long as it keeps its day keys and appends
+# exercises rather than reordering them. Each session also records the
+# program version it was planned under, so its planned sets stay what they
+# were when it was trained.
+
+import json
+import os
+import threading
+import time
+from typing import NamedTuple
+
+from progress import DayLayout
+
+try:
+    import yaml
+except ImportError:  # YAML programs are optional
+    yaml = None
+
+PLAN_SUFFIXES = (".json", ".yaml", ".yml") if yaml is not None else (".json",)
+
+
+class Exercise(NamedTuple):
+    name: str
+    sets: int
+    reps: str
+
+
+class PlanDay:
+    """One training day with its per-day lookups built once."""
+
+    __slots__ = ("key", "short", "exercises", "names", "index", "layout")
+
+    def __init__(self, key: str, short: str, exercises: list[Exercise]):
+        self.key = key
+        self.short = short
+        self.exercises = tuple(exercises)
+        self.names = tuple(ex.name for ex in self.exercises)
+        # name -> position; the first one wins if a day repeats an exercise.
+        self.index: dict[str, int] = {}
+        for i, name in enumerate(self.names):
+            self.index.setdefault(name, i)
+        self.layout = DayLayout([ex.sets for ex in self.exercises])
+
+
+class Program:
+    """A named, versioned list of training days."""
+
+    __slots__ = ("name", "title", "version", "days", "per_week", "source")
+
+    def __init__(self, name: str, title: str, version: int, days: list[PlanDay], per_week: int | None = None, source: str = ""):
+        self.name = name
+        self.title = title
+        self.version = version
+        self.days = {day.key: day for day in days}
+        # Training days a week the program asks for; streaks count weeks that hit it.
+        self.per_week = per_week or min(len(self.days), 7)
+        self.source = source
+
+    @property
+    def ref(self) -> str:
+        return f"{self.name}@{self.version}"
+
+
+def parse_program(doc, source: str = "") -> Program:
+    """Build a Program from a decoded plan document; raises ValueError if malformed."""
+    if not isinstance(doc, dict) or not isinstance(doc.get("days"), list) or not doc["days"]:
+        raise ValueError("a program needs a non-empty 'days' list")
+    name = doc.get("name") or os.path.splitext(os.path.basename(source))[0]
+    version = doc.get("version", 1)
+    if not isinstance(name, str) or type(version) is not int:
+        raise ValueError("'name' must be a string and 'version' an integer")
+    per_week = doc.get("sessions_per_week")
+    if per_week is not None and (type(per_week) is not int or not 1 <= per_week <= 7):
+        raise ValueError("'sessions_per_week' must be an integer from 1 to 7")
+
+    days = []
+    for day in doc["days"]:
+        key = day.get("key") if isinstance(day, dict) else None
+        if not isinstance(key, str) or not key or not isinstance(day.get("exercises"), list):
+            raise ValueError("every day needs a 'key' and an 'exercises' list")
+        exercises = []
+        for ex in day["exercises"]:
+            if not isinstance(ex, dict) or not isinstance(ex.get("name"), str) or type(ex.get("sets")) is not int or ex["sets"] < 1:
+                raise ValueError(f"{key}: every exercise needs a 'name' and a positive integer 'sets'")
+            exercises.append(Exercise(ex["name"], ex["sets"], str(ex.get("reps", ""))))
+        days.append(PlanDay(key, str(day.get("short") or key.split("–")[0].strip()), exercises))
+    if len({day.key for day in days}) != len(days):
+        raise ValueError("day keys must be unique within a program")
+    return Program(name, str(doc.get("title") or name), version, days, per_week, source)
+
+
+def load_program(path: str) -> Program:
+    with open(path, encoding="utf-8") as fh:
+        if path.endswith(".json"):
+            doc = json.load(fh)
+        elif yaml is not None:
+            doc = yaml.safe_load(fh)
+        else:
+            raise ValueError("PyYAML is not installed")
+    return parse_program(doc, path)
+
+
+class PlanCatalog:
+    """Every program found in a directory, kept in step with the files.
+
+    refresh() stats the directory at most every `check_interval` seconds and
+    re-parses only files whose mtime or size changed; `generation` moves
+    whenever the set of programs does, so callers can key caches on it.
+    """
+
+    def __init__(self, directory: str, check_interval: float = 1.0):
+        self.directory = directory
+        self.check_interval = check_interval
+        self.generation = 0
+        self.errors: dict[str, str] = {}
+        self._files: dict[str, tuple[int, int, Program]] = {}
+        self._programs: dict[str, dict[int, Program]] = {}
+        self._layouts: dict[str, DayLayout] = {}
+        self._totals: dict[tuple[str, str], int] = {}
+        self._checked = float("-inf")
+        self._lock = threading.Lock()
+        self.refresh(force=True)
+
+    def refresh(self, force: bool = False) -> bool:
+        """Pick up added, changed and removed plan files; returns whether anything changed."""
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._checked < self.check_interval:
+                return False
+            self._checked = now
+            try:
+                entries = [e for e in os.scandir(self.directory) if e.name.endswith(PLAN_SUFFIXES) and e.is_file()]
+            except FileNotFoundError:
+                entries = []
+
+            changed = False
+            seen = set()
+            for entry in entries:
+                seen.add(entry.path)
+                stat = entry.stat()
+                cached = self._files.get(entry.path)
+                if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                try:
+                    program = load_program(entry.path)
+                except (OSError, ValueError) as e:
+                    # Keep serving the last good parse of a file being edited.
+                    self.errors[entry.path] = str(e)
+                    continue
+                self.errors.pop(entry.path, None)
+                self._files[entry.path] = (stat.st_mtime_ns, stat.st_size, program)
+                changed = True
+            for path in self._files.keys() - seen:
+                del self._files[path]
+                self.errors.pop(path, None)
+                changed = True
+
+            if changed:
+                self._rebuild()
+                self.generation += 1
+            return changed
+
+    def _rebuild(self):
+        programs: dict[str, dict[int, Program]] = {}
+        for _, _, program in sorted(self._files.values(), key=lambda f: f[2].source):
+            programs.setdefault(program.name, {})[program.version] = program
+        self._programs = {name: dict(sorted(versions.items())) for name, versions in sorted(programs.items())}
+
+        # Historical sessions may belong to any program version: give every
+        # day key the widest layout any version has used for it.
+        sizes: dict[str, list[int]] = {}
+        for versions in self._programs.values():
+            for program in versions.values():
+                for key, day in program.days.items():
+                    widest = sizes.setdefault(key, [])
+                    widest.extend([0] * (len(day.layout.sizes) - len(widest)))
+                    for i, n in enumerate(day.layout.sizes):
+                        widest[i] = max(widest[i], n)
+        self._layouts = {key: DayLayout(s) for key, s in sizes.items()}
+        self._totals = {
+            (program.ref, key): day.layout.total
+            for versions in self._programs.values()
+            for program in versions.values()
+            for key, day in program.days.items()
+        }
+
+    def names(self) -> list[str]:
+        return list(self._programs)
+
+    def versions(self, name: str) -> list[int]:
+        return list(self._programs.get(name, ()))
+
+    def get(self, ref: str | None = None) -> Program:
+        """A program by "name" (latest version) or "name@version"; the first one by default."""
+        if not self._programs:
+            raise LookupError(f"no workout programs found in {self.directory}")
+        name, _, version = (ref or "").partition("@")
+        versions = self._programs.get(name) or next(iter(self._programs.values()))
+        if version.isdigit() and int(version) in versions:
+            return versions[int(version)]
+        return next(reversed(versions.values()))
+
+    def find(self, ref: str | None) -> Program | None:
+        """Exactly program version `ref` ("name@version"), if its file is still there."""
+        name, _, version = (ref or "").partition("@")
+        return self._programs.get(name, {}).get(int(version)) if version.isdigit() else None
+
+    def day_layout(self, ref: str | None, day: str) -> DayLayout | None:
+        """The layout a session of `day` recorded under `ref` was planned with.
+
+        Falls back to layouts()' widest layout when the version is unknown.
+        """
+        program = self.find(ref)
+        if program is not None and day in program.days:
+            return program.days[day].layout
+        return self._layouts.get(day)
+
+    def layouts(self) -> dict[str, DayLayout]:
+        """Bit layout per day key across every program and version, for history."""
+        return self._layouts
+
+    def planned_totals(self) -> dict[tuple[str, str], int]:
+        """Planned sets per (program ref, day key) for every known version."""
+        return self._totals
@@ -0,0 +1,167 @@
+# Workout Progress Tracker — opt-in hot-path instrumentation
+# Enable with TRACKER_PROFILE=1 or ?profile=1. Each full rerun records lap
+# times for the script's sections plus session_state read/write counts, shows
+# them in a collapsible panel and, with TRACKER_PROFILE_LOG=<path>, appends
+# them to a JSON-lines log. Disabled runs get a no-op profile.
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import streamlit as st
+from streamlit.runtime.state import SessionStateProxy
+
+_STATE_KEY = "__profile__"
+
+# Per-thread access counters for the script run in progress. The proxy is
+# patched process-wide once anyone enables profiling, so the wrappers only
+# count for sessions that have it enabled, and each Profile starts from zero
+# so fragment reruns (which never finish()) don't leak into the next run.
+# Widget callbacks run before the script, so callback() counts them on its
+# own and the next full run reports them.
+_local = threading.local()
+_install_lock = threading.Lock()
+_original: dict[str, object] = {}
+
+
+def _counting(method, counter: str):
+    def wrapper(self, *args):
+        counts = getattr(_local, "counts", None)
+        if counts is not None and _session_counters() is not None:
+            counts[counter] += 1
+        return method(self, *args)
+
+    return wrapper
+
+
+def _install_counters() -> None:
+    # Mapping.get/__contains__/setdefault/pop all go through these three.
+    with _install_lock:
+        if _original:
+            return
+        for name, counter in (("__getitem__", "reads"), ("__setitem__", "writes"), ("__delitem__", "writes")):
+            _original[name] = getattr(SessionStateProxy, name)
+            setattr(SessionStateProxy, name, _counting(_original[name], counter))
+
+
+def _session_counters() -> dict | None:
+    # Read our own bookkeeping without counting it.
+    if not _original:
+        return None
+    try:
+        return _original["__getitem__"](st.session_state, _STATE_KEY)
+    except KeyError:
+        return None
+
+
+def note(counter: str) -> None:
+    """Count an event (e.g. a fragment rerun) for this session, if profiling."""
+    counters = _session_counters()
+    if counters is not None:
+        counters[counter] = counters.get(counter, 0) + 1
+
+
+@contextmanager
+def callback(name: str):
+    """Time a widget callback and count its session_state access, if this
+    session is profiling; totals accumulate until the next full run."""
+    counters = _session_counters()
+    if counters is None:
+        yield
+        return
+    outer = getattr(_local, "counts", None)
+    _local.counts = counts = {"reads": 0, "writes": 0}
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _local.counts = outer
+        stats = counters.setdefault("callbacks", {}).setdefault(name, {"calls": 0, "ms": 0.0, "reads": 0, "writes": 0})
+        stats["calls"] += 1
+        stats["ms"] = round(stats["ms"] + elapsed * 1000, 2)
+        stats["reads"] += counts["reads"]
+        stats["writes"] += counts["writes"]
+
+
+def enabled() -> bool:
+    if os.environ.get("TRACKER_PROFILE", "") not in ("", "0"):
+        return True
+    return st.query_params.get("profile", "") not in ("", "0", "false")
+
+
+class NullProfile:
+    def lap(self, name: str) -> None:
+        pass
+
+    def finish(self) -> None:
+        pass
+
+
+class Profile:
+    """Lap timer for one full script run."""
+
+    def __init__(self):
+        _install_counters()
+        if _session_counters() is None:
+            _original["__setitem__"](st.session_state, _STATE_KEY, {})
+        note("full_runs")
+        # Callbacks that ran since the previous full run, this one's included.
+        self.callbacks = _session_counters().pop("callbacks", {})
+        _local.counts = {"reads": 0, "writes": 0}
+        self.laps: list[tuple[str, float]] = []
+        self._start = self._last = time.perf_counter()
+
+    def lap(self, name: str) -> None:
+        """Attribute the time since the previous lap to section `name`."""
+        now = time.perf_counter()
+        self.laps.append((name, now - self._last))
+        self._last = now
+
+    def finish(self) -> None:
+        total = time.perf_counter() - self._start
+        counts = _local.counts or {"reads": 0, "writes": 0}
+        _local.counts = None
+        record = {
+            "at": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "total_ms": round(total * 1000, 2),
+            "sections_ms": {name: round(sec * 1000, 2) for name, sec in self.laps},
+            "session_state": dict(counts),
+            "callbacks": self.callbacks,
+            "reruns": dict(_session_counters() or {}),
+        }
+        log_path = os.environ.get("TRACKER_PROFILE_LOG")
+        if log_path:
+            with open(log_path, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps(record) + "\n")
+        self._render(record)
+
+    def _render(self, record: dict) -> None:
+        with st.expander("⏱️ Profiling", expanded=False):
+            st.caption(f"Last full rerun: {record['total_ms']:.1f} ms")
+            st.dataframe(
+                [{"section": name, "ms": ms} for name, ms in record["sections_ms"].items()],
+                use_container_width=True,
+                hide_index=True,
+            )
+            counts, reruns = record["session_state"], record["reruns"]
+            st.caption(
+                f"session_state reads {counts['reads']} · writes {counts['writes']} · "
+                f"full runs {reruns.get('full_runs', 0)} · "
+                f"card fragment reruns {reruns.get('fragment_reruns', 0)}"
+            )
+            if record["callbacks"]:
+                st.caption("Callbacks since the previous full run")
+                st.dataframe(
+                    [{"callback": name, **stats} for name, stats in record["callbacks"].items()],
+                    use_container_width=True,
+                    hide_index=True,
+                )
+
+
+def start():
+    """Profile for the current run: a real one when enabled, else a no-op."""
+    return Profile() if enabled() else NullProfile()
@@ -0,0 +1,238 @@
+# Workout Progress Tracker — compact in-memory progress model
+# One (date, day) session is a single int bitmask: exercise i owns the bits
+# [offsets[i], offsets[i] + sizes[i]). Counters are maintained on every toggle
+# so the KPI row never has to recount.
+
+import math
+import sys
+from array import array
+from collections.abc import Iterable, Sequence
+from functools import lru_cache
+
+BITMASK_FORMAT = "bitmask-v1"
+# Bounds for layouts read from uploaded files, so a tiny document can't
+# expand into millions of rows.
+MAX_EXERCISES = 64
+MAX_SETS = 64
+
+
+class DayLayout:
+    """Bit addressing for one plan day, built from its per-exercise set counts."""
+
+    __slots__ = ("sizes", "offsets", "total", "ex_masks")
+
+    def __init__(self, sizes: Sequence[int]):
+        self.sizes = tuple(sizes)
+        offsets, total = [], 0
+        for n in self.sizes:
+            offsets.append(total)
+            total += n
+        self.offsets = tuple(offsets)
+        self.total = total
+        self.ex_masks = tuple(((1 << n) - 1) << off for n, off in zip(self.sizes, self.offsets))
+
+    def bit(self, ex_idx: int, set_idx: int) -> int:
+        return 1 << (self.offsets[ex_idx] + set_idx)
+
+    def locate(self, offset: int) -> tuple[int, int]:
+        """Inverse of bit(): (ex_idx, set_idx) for a bit offset."""
+        for ex_idx in range(len(self.sizes) - 1, -1, -1):
+            if offset >= self.offsets[ex_idx]:
+                return ex_idx, offset - self.offsets[ex_idx]
+        raise IndexError(offset)
+
+
+class DayProgress:
+    """Completion state of one session with incrementally maintained counters."""
+
+    __slots__ = ("layout", "mask", "done", "full")
+
+    def __init__(self, layout: DayLayout, mask: int = 0):
+        self.layout = layout
+        self.mask = mask & ((1 << layout.total) - 1)
+        self.done = self.mask.bit_count()
+        self.full = sum(1 for m in layout.ex_masks if self.mask & m == m)
+
+    @classmethod
+    def from_sets(cls, layout: DayLayout, sets: dict[tuple[int, int], bool]) -> "DayProgress":
+        mask = 0
+        for (ex_idx, set_idx), done in sets.items():
+            if done and ex_idx < len(layout.sizes) and set_idx < layout.sizes[ex_idx]:
+                mask |= layout.bit(ex_idx, set_idx)
+        return cls(layout, mask)
+
+    def is_done(self, ex_idx: int, set_idx: int) -> bool:
+        return bool(self.mask & self.layout.bit(ex_idx, set_idx))
+
+    def exercise_done(self, ex_idx: int) -> bool:
+        m = self.layout.ex_masks[ex_idx]
+        return self.mask & m == m
+
+    def _apply(self, bits: int, ex_mask: int, value: bool) -> None:
+        was_full = self.mask & ex_mask == ex_mask
+        before = self.mask & bits
+        if value:
+            self.mask |= bits
+            self.done += (bits ^ before).bit_count()
+        else:
+            self.mask &= ~bits
+            self.done -= before.bit_count()
+        is_full = self.mask & ex_mask == ex_mask
+        self.full += is_full - was_full
+
+    def set(self, ex_idx: int, set_idx: int, value: bool) -> None:
+        self._apply(self.layout.bit(ex_idx, set_idx), self.layout.ex_masks[ex_idx], value)
+
+    def set_exercise(self, ex_idx: int, value: bool) -> None:
+        m = self.layout.ex_masks[ex_idx]
+        self._apply(m, m, value)
+
+    def set_all(self, value: bool) -> None:
+        for m in self.layout.ex_masks:
+            self._apply(m, m, value)
+
+
+def set_key(d_str: str, day: str, ex_idx: int, set_idx: int) -> str:
+    return f"chk::{d_str}::{day}::ex{ex_idx}::set{set_idx}"
+
+
+# Widget keys for whole sessions. These live at module level because
+# Streamlit re-executes app.py as a fresh module on every rerun, which would
+# throw away any cache defined there.
+@lru_cache(maxsize=256)
+def set_keys(d_str: str, day: str, sizes: tuple[int, ...]) -> tuple[tuple[str, ...], ...]:
+    """Checkbox keys of one session's sets, as [ex_idx][set_idx]."""
+    return tuple(tuple(set_key(d_str, day, i, s) for s in range(n)) for i, n in enumerate(sizes))
+
+
+@lru_cache(maxsize=256)
+def load_keys(d_str: str, day: str, sizes: tuple[int, ...]) -> tuple[tuple[tuple[str, str], ...], ...]:
+    """(weight, reps) input keys of one session's sets, like set_keys()."""
+    prefix = f"load::{d_str}::{day}"
+    return tuple(
+        tuple((f"{prefix}::ex{i}::set{s}::w", f"{prefix}::ex{i}::set{s}::r") for s in range(n))
+        for i, n in enumerate(sizes)
+    )
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, data: bytes) -> array:
+    values = array(typecode, data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+class DayLoads:
+    """Logged weight and reps of one session, column-wise.
+
+    Two flat typed arrays with one slot per set in layout order: float32
+    weights (NaN = not logged) and uint16 reps (0 = not logged). They are
+    stored as-is, together with the layout they were written with, so old
+    sessions still decode after the plan changes.
+    """
+
+    __slots__ = ("layout", "weights", "reps")
+
+    def __init__(self, layout: DayLayout, weights: array | None = None, reps: array | None = None):
+        self.layout = layout
+        self.weights = weights if weights is not None else array("f", [math.nan]) * layout.total
+        self.reps = reps if reps is not None else array("H", [0]) * layout.total
+
+    @classmethod
+    def from_bytes(cls, layout: DayLayout, blobs: tuple[bytes, bytes, bytes] | None) -> "DayLoads":
+        loads = cls(layout)
+        if blobs is None:
+            return loads
+        stored = DayLayout(_from_little_endian("H", blobs[0]))
+        weights, reps = _from_little_endian("f", blobs[1]), _from_little_endian("H", blobs[2])
+        if stored.sizes == layout.sizes:
+            return cls(layout, weights, reps)
+        # Written under another plan version: carry over what still fits.
+        for ex_idx in range(min(len(stored.sizes), len(layout.sizes))):
+            n = min(stored.sizes[ex_idx], layout.sizes[ex_idx])
+            src, dst = stored.offsets[ex_idx], layout.offsets[ex_idx]
+            loads.weights[dst:dst + n] = weights[src:src + n]
+            loads.reps[dst:dst + n] = reps[src:src + n]
+        return loads
+
+    def get(self, ex_idx: int, set_idx: int) -> tuple[float | None, int | None]:
+        i = self.layout.offsets[ex_idx] + set_idx
+        weight, reps = self.weights[i], self.reps[i]
+        return (None if math.isnan(weight) else weight), (reps or None)
+
+    def set(self, ex_idx: int, set_idx: int, weight: float | None, reps: int | None) -> None:
+        i = self.layout.offsets[ex_idx] + set_idx
+        self.weights[i] = math.nan if weight is None else weight
+        self.reps[i] = min(max(int(reps or 0), 0), 0xFFFF)
+
+    def to_bytes(self) -> tuple[bytes, bytes, bytes]:
+        return _little_endian(array("H", self.layout.sizes)), _little_endian(self.weights), _little_endian(self.reps)
+
+
+def encode_bitmask(rows: Iterable[tuple[str, str, int, int, bool]], layouts: dict[str, DayLayout]) -> dict:
+    """Compact export: one hex mask per session instead of one key per set.
+
+    Days missing from `layouts` get a layout inferred from the recorded rows;
+    each session carries its layout so the document decodes on its own.
+    """
+    sessions: dict[tuple[str, str], dict[tuple[int, int], bool]] = {}
+    for d_str, day, ex_idx, set_idx, done in rows:
+        sessions.setdefault((d_str, day), {})[(ex_idx, set_idx)] = done
+
+    out = []
+    for (d_str, day), sets in sessions.items():
+        layout = layouts.get(day)
+        if layout is None:
+            sizes = [0] * (max(ex_idx for ex_idx, _ in sets) + 1)
+            for ex_idx, set_idx in sets:
+                sizes[ex_idx] = max(sizes[ex_idx], set_idx + 1)
+            layout = DayLayout(sizes)
+        mask = DayProgress.from_sets(layout, sets).mask
+        out.append({"date": d_str, "day": day, "layout": list(layout.sizes), "mask": format(mask, "x")})
+    return {"format": BITMASK_FORMAT, "sessions": out}
+
+
+def decode_session(session, layouts: dict[str, DayLayout] | None = None) -> list[tuple[str, str, int, int, bool]] | None:
+    """Rows for one bitmask session (done and not done), or None if malformed.
+
+    Everything is checked before anything is expanded. Days found in
+    `layouts` only yield the sets their plan layout has; other days are
+    held to MAX_EXERCISES x MAX_SETS.
+    """
+    if not isinstance(session, dict):
+        return None
+    d_str, day, sizes, mask = session.get("date"), session.get("day"), session.get("layout"), session.get("mask")
+    if not (isinstance(d_str, str) and isinstance(day, str) and isinstance(sizes, list) and isinstance(mask, str)):
+        return None
+    if len(sizes) > MAX_EXERCISES or not all(type(n) is int and 0 <= n <= MAX_SETS for n in sizes):
+        return None
+    layout = DayLayout(sizes)
+    if not mask or len(mask) > (layout.total + 3) // 4 + 1:
+        return None
+    try:
+        bits = int(mask, 16)
+    except ValueError:
+        return None
+    if bits < 0 or bits.bit_length() > layout.total:
+        return None
+    plan = (layouts or {}).get(day)
+    rows = []
+    for ex_idx, size in enumerate(layout.sizes):
+        if plan is not None:
+            size = min(size, plan.sizes[ex_idx]) if ex_idx < len(plan.sizes) else 0
+        for set_idx in range(size):
+            rows.append((d_str, day, ex_idx, set_idx, bool(bits & layout.bit(ex_idx, set_idx))))
+    return rows
+
+
+def decode_bitmask(doc: dict, layouts: dict[str, DayLayout] | None = None) -> Iterable[tuple[str, str, int, int, bool]]:
+    """Rows for every well-formed session of a bitmask export; see decode_session()."""
+    for session in doc["sessions"]:
+        yield from decode_session(session, layouts) or ()
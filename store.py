@@ -0,0 +1,840 @@
+# Workout Progress Tracker — progress persistence
+# Every set is one row keyed by (user, date, day, exercise, set). The app only
+# talks to the ProgressStore interface; open_store() picks the backend from a
+# spec string such as "sqlite:workout_progress.db" or "memory:".
+#
+# A backend is shared by every session (and, for SQLite, every worker
+# process); store.for_user(name) hands out a view bound to one user's
+# namespace. The default namespace "" holds the single-user data from before
+# users existed.
+
+import queue
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# (date, day, exercise index, set index, done)
+SetRow = tuple[str, str, int, int, bool]
+# A SetRow plus the time.time() the change was made, for writes that reach
+# the store later than they happened (see ProgressStore.set_many).
+StampedRow = tuple[str, str, int, int, bool, float]
+
+# How long a writer waits for another process's transaction, in seconds.
+BUSY_TIMEOUT = 10.0
+
+
+class Batch:
+    """Set changes collected for one atomic store write.
+
+    A later change to the same set replaces the earlier one, so callers can
+    compose operations (e.g. reset a week, then re-mark one day) freely.
+    Sessions the batch creates are recorded under `program`, as with
+    ProgressStore.set_many().
+    """
+
+    __slots__ = ("_changes", "program")
+
+    def __init__(self, program: str | None = None):
+        self._changes: dict[tuple[str, str, int, int], bool] = {}
+        self.program = program
+
+    def set(self, d_str: str, day: str, ex_idx: int, set_idx: int, done: bool) -> None:
+        self._changes[(d_str, day, ex_idx, set_idx)] = bool(done)
+
+    def extend(self, rows: Iterable[SetRow]) -> None:
+        for d_str, day, ex_idx, set_idx, done in rows:
+            self._changes[(d_str, day, ex_idx, set_idx)] = bool(done)
+
+    def rows(self) -> list[SetRow]:
+        return [(*key, done) for key, done in self._changes.items()]
+
+    def __len__(self) -> int:
+        return len(self._changes)
+
+
+class ProgressStore:
+    """Interface shared by all persistence backends.
+
+    Backends also accept a `user` keyword on every data method below
+    (default "", the single-user namespace); for_user() binds one.
+    """
+
+    user = ""
+
+    def day_sets(self, d_str: str, day: str) -> dict[tuple[int, int], bool]:
+        """All recorded sets of one session, as {(ex_idx, set_idx): done}."""
+        raise NotImplementedError
+
+    def set_many(self, rows: Iterable[SetRow | StampedRow], program: str | None = None) -> None:
+        """Upsert set states in a single write.
+
+        Sessions this write creates are recorded as planned under program
+        `program` (e.g. "name@2"). Sessions keep the program they were first
+        written under, so a later plan version never changes an old
+        session's planned sets.
+
+        Every set remembers when it last changed: a StampedRow older than
+        that is skipped, so a change replayed late can't undo a newer one.
+        Plain SetRows are stamped with the time of the write.
+        """
+        raise NotImplementedError
+
+    def items(self) -> Iterator[SetRow]:
+        """Every recorded set, ordered by (date, day, exercise, set)."""
+        raise NotImplementedError
+
+    def day_counts(self) -> list[tuple[str, str, int, int, str | None]]:
+        """(date, day, recorded sets, completed sets, program) per session, ordered.
+
+        Backends keep these aggregates up to date on every write, so this
+        costs one row per session rather than one per set. `program` is the
+        ref passed with the write that created the session (None for
+        sessions from before programs were recorded).
+        """
+        raise NotImplementedError
+
+    def sessions_between(self, start: str, end: str) -> list[tuple[str, str, str | None]]:
+        """(date, day, program) of every recorded session with start <= date <= end."""
+        raise NotImplementedError
+
+    def latest_session(self, day: str, before: str) -> str | None:
+        """Date of the most recent session of `day` with completed sets before `before`."""
+        raise NotImplementedError
+
+    def exercise_counts(self) -> list[tuple[str, int, int]]:
+        """(day, exercise index, completed sets) across the whole history."""
+        raise NotImplementedError
+
+    def version(self) -> int:
+        """Data revision, bumped by every write; use it as a cache key.
+
+        Revisions are per user, so one user's writes don't invalidate anyone
+        else's caches.
+        """
+        raise NotImplementedError
+
+    def day_loads(self, d_str: str, day: str) -> tuple[bytes, bytes, bytes] | None:
+        """Logged loads of one session as (sizes, weights, reps) arrays, or None.
+
+        The blobs are little-endian uint16 sets per exercise, float32 weight
+        per set (NaN where nothing was logged) and uint16 reps per set (0
+        where nothing was logged); see progress.DayLoads.
+        """
+        raise NotImplementedError
+
+    def set_loads(self, d_str: str, day: str, sizes: bytes, weights: bytes, reps: bytes, at: float | None = None) -> None:
+        """Replace one session's logged loads in a single write.
+
+        `at` is the time.time() of the edit (default: now); like set_many(),
+        an edit older than the session's stored loads is skipped.
+        """
+        raise NotImplementedError
+
+    def load_items(self) -> list[tuple[str, str, bytes, bytes, bytes]]:
+        """(date, day, sizes, weights, reps) of every session with logged loads, ordered."""
+        raise NotImplementedError
+
+    def has_import(self, digest: str) -> bool:
+        """Whether a file with this content hash has already been applied."""
+        raise NotImplementedError
+
+    def import_rows(self, digest: str, rows: Iterable[SetRow], program: str | None = None) -> bool:
+        """Apply an import in one write unless `digest` was seen before.
+
+        Returns False (and writes nothing) for a duplicate. `program` is as
+        for set_many().
+        """
+        raise NotImplementedError
+
+    @contextmanager
+    def batch(self, program: str | None = None) -> Iterator[Batch]:
+        """Collect changes and apply them as one write when the block exits.
+
+        Nothing is written if the block raises.
+        """
+        batch = Batch(program)
+        yield batch
+        if batch:
+            self.set_many(batch.rows(), program=batch.program)
+
+    def for_user(self, user: str) -> "ProgressStore":
+        """A view of this store restricted to `user`'s namespace."""
+        return UserStore(self, user)
+
+    def cache_key(self) -> tuple:
+        """Identifies the data behind this handle, for caches shared across sessions."""
+        return (id(self), self.user)
+
+    def close(self) -> None:
+        pass
+
+
+class UserStore(ProgressStore):
+    """One user's namespace of a shared backend.
+
+    Cheap to create, so the app makes one per run on top of the process-wide
+    backend.
+    """
+
+    def __init__(self, backend: ProgressStore, user: str):
+        self.backend = backend
+        self.user = user
+
+    def day_sets(self, d_str, day):
+        return self.backend.day_sets(d_str, day, user=self.user)
+
+    def set_many(self, rows, program=None):
+        self.backend.set_many(rows, program=program, user=self.user)
+
+    def items(self):
+        return self.backend.items(user=self.user)
+
+    def day_counts(self):
+        return self.backend.day_counts(user=self.user)
+
+    def sessions_between(self, start, end):
+        return self.backend.sessions_between(start, end, user=self.user)
+
+    def latest_session(self, day, before):
+        return self.backend.latest_session(day, before, user=self.user)
+
+    def exercise_counts(self):
+        return self.backend.exercise_counts(user=self.user)
+
+    def version(self):
+        return self.backend.version(user=self.user)
+
+    def day_loads(self, d_str, day):
+        return self.backend.day_loads(d_str, day, user=self.user)
+
+    def set_loads(self, d_str, day, sizes, weights, reps, at=None):
+        self.backend.set_loads(d_str, day, sizes, weights, reps, at=at, user=self.user)
+
+    def load_items(self):
+        return self.backend.load_items(user=self.user)
+
+    def has_import(self, digest):
+        return self.backend.has_import(digest, user=self.user)
+
+    def import_rows(self, digest, rows, program=None):
+        return self.backend.import_rows(digest, rows, program=program, user=self.user)
+
+    def for_user(self, user):
+        return self.backend.for_user(user)
+
+    def cache_key(self):
+        return (id(self.backend), self.user)
+
+    def close(self):
+        # The backend is shared; whoever opened it closes it.
+        pass
+
+
+class _MemoryNamespace:
+    __slots__ = ("rows", "updated", "completed", "ex_completed", "loads", "programs", "imports", "revision")
+
+    def __init__(self):
+        self.rows: dict[tuple[str, str], dict[tuple[int, int], bool]] = {}
+        # When each set (keyed (date, day, ex, set)) and each session's loads
+        # (keyed (date, day)) last changed.
+        self.updated: dict[tuple, float] = {}
+        self.programs: dict[tuple[str, str], str | None] = {}
+        self.loads: dict[tuple[str, str], tuple[bytes, bytes, bytes]] = {}
+        self.completed: dict[tuple[str, str], int] = {}
+        self.ex_completed: dict[tuple[str, int], int] = {}
+        self.imports: set[str] = set()
+        self.revision = 0
+
+
+class MemoryStore(ProgressStore):
+    """Process-local store, handy for tests and throwaway sessions."""
+
+    def __init__(self, _target: str = ""):
+        self._users: dict[str, _MemoryNamespace] = {}
+        self._lock = threading.Lock()
+
+    def _ns(self, user: str) -> _MemoryNamespace:
+        ns = self._users.get(user)
+        if ns is None:
+            ns = self._users[user] = _MemoryNamespace()
+        return ns
+
+    def day_sets(self, d_str, day, user=""):
+        with self._lock:
+            return dict(self._ns(user).rows.get((d_str, day), {}))
+
+    def set_many(self, rows, program=None, user=""):
+        with self._lock:
+            self._apply(self._ns(user), rows, program)
+
+    def _apply(self, ns, rows, program):
+        now = time.time()
+        for d_str, day, ex_idx, set_idx, done, *at in rows:
+            at = at[0] if at else now
+            if at < ns.updated.get((d_str, day, ex_idx, set_idx), at):
+                continue  # a newer change is already recorded
+            ns.updated[(d_str, day, ex_idx, set_idx)] = at
+            if (d_str, day) not in ns.rows:
+                ns.programs[(d_str, day)] = program
+            sets = ns.rows.setdefault((d_str, day), {})
+            delta = bool(done) - sets.get((ex_idx, set_idx), False)
+            ns.completed[(d_str, day)] = ns.completed.get((d_str, day), 0) + delta
+            ns.ex_completed[(day, ex_idx)] = ns.ex_completed.get((day, ex_idx), 0) + delta
+            sets[(ex_idx, set_idx)] = bool(done)
+        ns.revision += 1
+
+    def items(self, user=""):
+        with self._lock:
+            snapshot = sorted(self._ns(user).rows.items())
+        for (d_str, day), sets in snapshot:
+            for (ex_idx, set_idx), done in sorted(sets.items()):
+                yield d_str, day, ex_idx, set_idx, done
+
+    def day_counts(self, user=""):
+        with self._lock:
+            ns = self._ns(user)
+            return [
+                (d_str, day, len(sets), ns.completed[(d_str, day)], ns.programs.get((d_str, day)))
+                for (d_str, day), sets in sorted(ns.rows.items())
+            ]
+
+    def sessions_between(self, start, end, user=""):
+        with self._lock:
+            ns = self._ns(user)
+            return sorted((*key, ns.programs.get(key)) for key in ns.rows if start <= key[0] <= end)
+
+    def latest_session(self, day, before, user=""):
+        with self._lock:
+            completed = self._ns(user).completed
+            dates = [d_str for (d_str, d), n in completed.items() if d == day and d_str < before and n > 0]
+        return max(dates, default=None)
+
+    def exercise_counts(self, user=""):
+        with self._lock:
+            return [(day, ex_idx, n) for (day, ex_idx), n in sorted(self._ns(user).ex_completed.items())]
+
+    def version(self, user=""):
+        with self._lock:
+            return self._ns(user).revision
+
+    def day_loads(self, d_str, day, user=""):
+        with self._lock:
+            return self._ns(user).loads.get((d_str, day))
+
+    def set_loads(self, d_str, day, sizes, weights, reps, at=None, user=""):
+        at = time.time() if at is None else at
+        with self._lock:
+            ns = self._ns(user)
+            if at >= ns.updated.get((d_str, day), at):
+                ns.updated[(d_str, day)] = at
+                ns.loads[(d_str, day)] = (bytes(sizes), bytes(weights), bytes(reps))
+            ns.revision += 1
+
+    def load_items(self, user=""):
+        with self._lock:
+            return [(*key, *blobs) for key, blobs in sorted(self._ns(user).loads.items())]
+
+    def has_import(self, digest, user=""):
+        with self._lock:
+            return digest in self._ns(user).imports
+
+    def import_rows(self, digest, rows, program=None, user=""):
+        with self._lock:
+            ns = self._ns(user)
+            if digest in ns.imports:
+                return False
+            ns.imports.add(digest)
+            self._apply(ns, rows, program)
+            return True
+
+
+# Schema migrations, applied in order and tracked with PRAGMA user_version.
+_MIGRATIONS = [
+    """
+    CREATE TABLE sets (
+        date    TEXT    NOT NULL,
+        day     TEXT    NOT NULL,
+        ex      INTEGER NOT NULL,
+        set_idx INTEGER NOT NULL,
+        done    INTEGER NOT NULL,
+        PRIMARY KEY (date, day, ex, set_idx)
+    ) WITHOUT ROWID;
+    """,
+    # Per-session aggregates kept current by triggers, plus a revision counter.
+    """
+    CREATE TABLE day_stats (
+        date      TEXT    NOT NULL,
+        day       TEXT    NOT NULL,
+        recorded  INTEGER NOT NULL,
+        completed INTEGER NOT NULL,
+        PRIMARY KEY (date, day)
+    ) WITHOUT ROWID;
+    INSERT INTO day_stats SELECT date, day, COUNT(*), SUM(done) FROM sets GROUP BY date, day;
+
+    CREATE TRIGGER sets_ai AFTER INSERT ON sets BEGIN
+        INSERT INTO day_stats (date, day, recorded, completed) VALUES (NEW.date, NEW.day, 1, NEW.done)
+        ON CONFLICT (date, day) DO UPDATE SET recorded = recorded + 1, completed = completed + NEW.done;
+    END;
+    CREATE TRIGGER sets_au AFTER UPDATE OF done ON sets BEGIN
+        UPDATE day_stats SET completed = completed + NEW.done - OLD.done
+        WHERE date = NEW.date AND day = NEW.day;
+    END;
+    CREATE TRIGGER sets_ad AFTER DELETE ON sets BEGIN
+        UPDATE day_stats SET recorded = recorded - 1, completed = completed - OLD.done
+        WHERE date = OLD.date AND day = OLD.day;
+        DELETE FROM day_stats WHERE date = OLD.date AND day = OLD.day AND recorded = 0;
+    END;
+
+    CREATE TABLE meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL) WITHOUT ROWID;
+    INSERT INTO meta VALUES ('revision', 0);
+    """,
+    # Per-exercise totals across the whole history, for adherence analytics.
+    """
+    CREATE TABLE ex_stats (
+        day       TEXT    NOT NULL,
+        ex        INTEGER NOT NULL,
+        completed INTEGER NOT NULL,
+        PRIMARY KEY (day, ex)
+    ) WITHOUT ROWID;
+    INSERT INTO ex_stats SELECT day, ex, SUM(done) FROM sets GROUP BY day, ex;
+
+    CREATE TRIGGER sets_ai_ex AFTER INSERT ON sets BEGIN
+        INSERT INTO ex_stats (day, ex, completed) VALUES (NEW.day, NEW.ex, NEW.done)
+        ON CONFLICT (day, ex) DO UPDATE SET completed = completed + NEW.done;
+    END;
+    CREATE TRIGGER sets_au_ex AFTER UPDATE OF done ON sets BEGIN
+        UPDATE ex_stats SET completed = completed + NEW.done - OLD.done
+        WHERE day = NEW.day AND ex = NEW.ex;
+    END;
+    CREATE TRIGGER sets_ad_ex AFTER DELETE ON sets BEGIN
+        UPDATE ex_stats SET completed = completed - OLD.done WHERE day = OLD.day AND ex = OLD.ex;
+    END;
+    """,
+    # Content hashes of applied imports, so a file is never applied twice.
+    """
+    CREATE TABLE imports (
+        sha256      TEXT    PRIMARY KEY,
+        imported_at TEXT    NOT NULL,
+        rows        INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    """,
+    # "Latest session of this day" lookups for copying a previous session.
+    """
+    CREATE INDEX day_stats_by_day ON day_stats (day, date);
+    """,
+    # Per-user namespaces: every key gains a leading user column and the
+    # revision counter becomes per user. Existing data moves to user "".
+    """
+    DROP TRIGGER sets_ai;
+    DROP TRIGGER sets_au;
+    DROP TRIGGER sets_ad;
+    DROP TRIGGER sets_ai_ex;
+    DROP TRIGGER sets_au_ex;
+    DROP TRIGGER sets_ad_ex;
+
+    CREATE TABLE sets_v2 (
+        user    TEXT    NOT NULL,
+        date    TEXT    NOT NULL,
+        day     TEXT    NOT NULL,
+        ex      INTEGER NOT NULL,
+        set_idx INTEGER NOT NULL,
+        done    INTEGER NOT NULL,
+        PRIMARY KEY (user, date, day, ex, set_idx)
+    ) WITHOUT ROWID;
+    INSERT INTO sets_v2 SELECT '', date, day, ex, set_idx, done FROM sets;
+    DROP TABLE sets;
+    ALTER TABLE sets_v2 RENAME TO sets;
+
+    CREATE TABLE day_stats_v2 (
+        user      TEXT    NOT NULL,
+        date      TEXT    NOT NULL,
+        day       TEXT    NOT NULL,
+        recorded  INTEGER NOT NULL,
+        completed INTEGER NOT NULL,
+        PRIMARY KEY (user, date, day)
+    ) WITHOUT ROWID;
+    INSERT INTO day_stats_v2 SELECT '', date, day, recorded, completed FROM day_stats;
+    DROP TABLE day_stats;
+    ALTER TABLE day_stats_v2 RENAME TO day_stats;
+    CREATE INDEX day_stats_by_day ON day_stats (user, day, date);
+
+    CREATE TABLE ex_stats_v2 (
+        user      TEXT    NOT NULL,
+        day       TEXT    NOT NULL,
+        ex        INTEGER NOT NULL,
+        completed INTEGER NOT NULL,
+        PRIMARY KEY (user, day, ex)
+    ) WITHOUT ROWID;
+    INSERT INTO ex_stats_v2 SELECT '', day, ex, completed FROM ex_stats;
+    DROP TABLE ex_stats;
+    ALTER TABLE ex_stats_v2 RENAME TO ex_stats;
+
+    CREATE TABLE imports_v2 (
+        user        TEXT    NOT NULL,
+        sha256      TEXT    NOT NULL,
+        imported_at TEXT    NOT NULL,
+        rows        INTEGER NOT NULL,
+        PRIMARY KEY (user, sha256)
+    ) WITHOUT ROWID;
+    INSERT INTO imports_v2 SELECT '', sha256, imported_at, rows FROM imports;
+    DROP TABLE imports;
+    ALTER TABLE imports_v2 RENAME TO imports;
+
+    CREATE TABLE revisions (user TEXT PRIMARY KEY, value INTEGER NOT NULL) WITHOUT ROWID;
+    INSERT INTO revisions SELECT '', value FROM meta WHERE key = 'revision';
+    DROP TABLE meta;
+
+    CREATE TRIGGER sets_ai AFTER INSERT ON sets BEGIN
+        INSERT INTO day_stats (user, date, day, recorded, completed) VALUES (NEW.user, NEW.date, NEW.day, 1, NEW.done)
+        ON CONFLICT (user, date, day) DO UPDATE SET recorded = recorded + 1, completed = completed + NEW.done;
+        INSERT INTO ex_stats (user, day, ex, completed) VALUES (NEW.user, NEW.day, NEW.ex, NEW.done)
+        ON CONFLICT (user, day, ex) DO UPDATE SET completed = completed + NEW.done;
+    END;
+    CREATE TRIGGER sets_au AFTER UPDATE OF done ON sets WHEN NEW.done != OLD.done BEGIN
+        UPDATE day_stats SET completed = completed + NEW.done - OLD.done
+        WHERE user = NEW.user AND date = NEW.date AND day = NEW.day;
+        UPDATE ex_stats SET completed = completed + NEW.done - OLD.done
+        WHERE user = NEW.user AND day = NEW.day AND ex = NEW.ex;
+    END;
+    CREATE TRIGGER sets_ad AFTER DELETE ON sets BEGIN
+        UPDATE day_stats SET recorded = recorded - 1, completed = completed - OLD.done
+        WHERE user = OLD.user AND date = OLD.date AND day = OLD.day;
+        DELETE FROM day_stats WHERE user = OLD.user AND date = OLD.date AND day = OLD.day AND recorded = 0;
+        UPDATE ex_stats SET completed = completed - OLD.done
+        WHERE user = OLD.user AND day = OLD.day AND ex = OLD.ex;
+    END;
+    """,
+    # Logged weight and reps, one row per session holding column arrays
+    # (see ProgressStore.day_loads for the blob formats).
+    """
+    CREATE TABLE set_loads (
+        user    TEXT NOT NULL,
+        date    TEXT NOT NULL,
+        day     TEXT NOT NULL,
+        sizes   BLOB NOT NULL,
+        weights BLOB NOT NULL,
+        reps    BLOB NOT NULL,
+        PRIMARY KEY (user, date, day)
+    ) WITHOUT ROWID;
+    """,
+    # The program version each session was planned under, snapshotted from
+    # the user's current program when its first set is inserted.
+    """
+    ALTER TABLE day_stats ADD COLUMN program TEXT;
+    CREATE TABLE user_programs (user TEXT PRIMARY KEY, program TEXT NOT NULL) WITHOUT ROWID;
+
+    DROP TRIGGER sets_ai;
+    CREATE TRIGGER sets_ai AFTER INSERT ON sets BEGIN
+        INSERT INTO day_stats (user, date, day, recorded, completed, program)
+        VALUES (NEW.user, NEW.date, NEW.day, 1, NEW.done, (SELECT program FROM user_programs WHERE user = NEW.user))
+        ON CONFLICT (user, date, day) DO UPDATE SET recorded = recorded + 1, completed = completed + NEW.done;
+        INSERT INTO ex_stats (user, day, ex, completed) VALUES (NEW.user, NEW.day, NEW.ex, NEW.done)
+        ON CONFLICT (user, day, ex) DO UPDATE SET completed = completed + NEW.done;
+    END;
+    """,
+    # A per-user "current program" row is shared by every session of that
+    # user, so concurrent sessions overwrote each other's. Each write now
+    # carries its own program and creates its new sessions' rows with it
+    # (see SQLiteStore._apply).
+    """
+    DROP TABLE user_programs;
+
+    DROP TRIGGER sets_ai;
+    CREATE TRIGGER sets_ai AFTER INSERT ON sets BEGIN
+        INSERT INTO day_stats (user, date, day, recorded, completed) VALUES (NEW.user, NEW.date, NEW.day, 1, NEW.done)
+        ON CONFLICT (user, date, day) DO UPDATE SET recorded = recorded + 1, completed = completed + NEW.done;
+        INSERT INTO ex_stats (user, day, ex, completed) VALUES (NEW.user, NEW.day, NEW.ex, NEW.done)
+        ON CONFLICT (user, day, ex) DO UPDATE SET completed = completed + NEW.done;
+    END;
+    """,
+    # When each set and each session's loads last changed, so a write that
+    # arrives late (a journal replayed after a crash) can't undo a newer one.
+    """
+    ALTER TABLE sets ADD COLUMN updated_at REAL NOT NULL DEFAULT 0;
+    ALTER TABLE set_loads ADD COLUMN updated_at REAL NOT NULL DEFAULT 0;
+    """,
+]
+
+_UPSERT_SET = (
+    "INSERT INTO sets (user, date, day, ex, set_idx, done, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (user, date, day, ex, set_idx) DO UPDATE SET done = excluded.done, updated_at = excluded.updated_at "
+    "WHERE excluded.updated_at >= sets.updated_at"
+)
+
+
+def _set_params(user: str, rows: Iterable[SetRow | StampedRow]) -> list[tuple]:
+    now = time.time()
+    return [
+        (user, d_str, day, ex_idx, set_idx, int(bool(done)), at[0] if at else now)
+        for d_str, day, ex_idx, set_idx, done, *at in rows
+    ]
+
+
+# Creates the sessions a write is about to insert, under the write's
+# program; sets_ai then only counts their sets in.
+_NEW_SESSION = (
+    "INSERT INTO day_stats (user, date, day, recorded, completed, program) VALUES (?, ?, ?, 0, 0, ?) "
+    "ON CONFLICT (user, date, day) DO NOTHING"
+)
+
+_UPSERT_LOADS = (
+    "INSERT INTO set_loads (user, date, day, sizes, weights, reps, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (user, date, day) DO UPDATE SET sizes = excluded.sizes, weights = excluded.weights, reps = excluded.reps, "
+    "updated_at = excluded.updated_at WHERE excluded.updated_at >= set_loads.updated_at"
+)
+
+
+class _Write:
+    """One caller's write, waiting to be committed as part of a group."""
+
+    __slots__ = ("user", "params", "digest", "loads", "program", "done", "result", "error")
+
+    def __init__(
+        self, user: str, params: list[tuple], digest: str | None = None, loads: tuple | None = None, program: str | None = None
+    ):
+        self.user = user
+        self.params = params
+        self.digest = digest
+        self.loads = loads
+        self.program = program
+        self.done = False
+        self.result = True
+        self.error: BaseException | None = None
+
+
+class SQLiteStore(ProgressStore):
+    """Durable store backed by a SQLite file in WAL mode.
+
+    The primary key doubles as the index, so a session lookup is a range scan
+    over (user, date, day) and never touches other history.
+
+    Reads borrow a connection from a small pool and run concurrently; WAL
+    readers never wait for a writer, not even another process's. Writes share
+    one connection with group commit: whoever takes the writer lock commits
+    every write queued up in the meantime as a single transaction, so a burst
+    of sessions ticking sets costs one commit rather than one each. Writers
+    in other worker processes are serialised by SQLite's file locking and
+    waited out for up to BUSY_TIMEOUT.
+    """
+
+    def __init__(self, path: str, readers: int = 4):
+        self.path = path
+        self._writer = self._connect()
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        self._writer.execute("PRAGMA synchronous=NORMAL")
+        self._writer_lock = threading.Lock()
+        self._pending: list[_Write] = []
+        self._pending_lock = threading.Lock()
+        self._readers: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._reader_slots = threading.BoundedSemaphore(readers)
+        self._opened: list[sqlite3.Connection] = []
+        self._migrate()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Streamlit serves every session from its own thread; a connection is
+        # only ever used by one thread at a time (the pool or the writer lock
+        # sees to that).
+        return sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, check_same_thread=False, isolation_level=None)
+
+    def _migrate(self):
+        with self._writer_lock:
+            conn = self._writer
+            current = conn.execute("PRAGMA user_version").fetchone()[0]
+            for version, script in enumerate(_MIGRATIONS[current:], start=current + 1):
+                try:
+                    conn.executescript(f"BEGIN IMMEDIATE;{script}PRAGMA user_version={version};COMMIT;")
+                except sqlite3.OperationalError:
+                    # Another worker process starting at the same time may
+                    # have applied this migration first.
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    if conn.execute("PRAGMA user_version").fetchone()[0] < version:
+                        raise
+
+    @contextmanager
+    def _read(self) -> Iterator[sqlite3.Connection]:
+        with self._reader_slots:
+            try:
+                conn = self._readers.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+                conn.execute("PRAGMA query_only=1")
+                self._opened.append(conn)
+            try:
+                yield conn
+            finally:
+                self._readers.put(conn)
+
+    def _submit(self, write: _Write):
+        with self._pending_lock:
+            self._pending.append(write)
+        with self._writer_lock:
+            # Whoever held the lock before us may have committed this write
+            # along with its own.
+            if not write.done:
+                with self._pending_lock:
+                    group, self._pending = self._pending, []
+                self._commit_group(group)
+        if write.error is not None:
+            raise write.error
+        return write.result
+
+    def _commit_group(self, group: list[_Write]):
+        conn = self._writer
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            touched = set()
+            for write in group:
+                # A savepoint per write, so one failing write doesn't take
+                # the rest of the group down with it.
+                conn.execute("SAVEPOINT write")
+                try:
+                    write.result = self._apply(conn, write)
+                    conn.execute("RELEASE write")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO write")
+                    conn.execute("RELEASE write")
+                    write.error = e
+                    continue
+                if write.result:
+                    touched.add(write.user)
+            conn.executemany(
+                "INSERT INTO revisions (user, value) VALUES (?, 1) ON CONFLICT (user) DO UPDATE SET value = value + 1",
+                [(user,) for user in touched],
+            )
+            conn.execute("COMMIT")
+        except BaseException as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for write in group:
+                write.error = write.error or e
+        finally:
+            for write in group:
+                write.done = True
+
+    @staticmethod
+    def _apply(conn: sqlite3.Connection, write: _Write) -> bool:
+        if write.digest is not None:
+            seen = conn.execute(
+                "SELECT 1 FROM imports WHERE user = ? AND sha256 = ?", (write.user, write.digest)
+            ).fetchone()
+            if seen:
+                # Another session or process applied the same file first.
+                return False
+            conn.execute(
+                "INSERT INTO imports (user, sha256, imported_at, rows) VALUES (?, ?, ?, ?)",
+                (write.user, write.digest, datetime.now(timezone.utc).isoformat(timespec="seconds"), len(write.params)),
+            )
+        if write.program is not None:
+            sessions = {(user, d_str, day) for user, d_str, day, *_ in write.params}
+            conn.executemany(_NEW_SESSION, [(*key, write.program) for key in sessions])
+        conn.executemany(_UPSERT_SET, write.params)
+        if write.loads is not None:
+            conn.execute(_UPSERT_LOADS, (write.user, *write.loads))
+        return True
+
+    def day_sets(self, d_str, day, user=""):
+        with self._read() as conn:
+            cur = conn.execute(
+                "SELECT ex, set_idx, done FROM sets WHERE user = ? AND date = ? AND day = ?",
+                (user, d_str, day),
+            )
+            return {(ex_idx, set_idx): bool(done) for ex_idx, set_idx, done in cur}
+
+    def set_many(self, rows, program=None, user=""):
+        params = _set_params(user, rows)
+        if params:
+            self._submit(_Write(user, params, program=program))
+
+    def items(self, user=""):
+        with self._read() as conn:
+            rows = conn.execute(
+                "SELECT date, day, ex, set_idx, done FROM sets WHERE user = ? ORDER BY date, day, ex, set_idx",
+                (user,),
+            ).fetchall()
+        for d_str, day, ex_idx, set_idx, done in rows:
+            yield d_str, day, ex_idx, set_idx, bool(done)
+
+    def day_counts(self, user=""):
+        with self._read() as conn:
+            return conn.execute(
+                "SELECT date, day, recorded, completed, program FROM day_stats WHERE user = ? ORDER BY date, day", (user,)
+            ).fetchall()
+
+    def sessions_between(self, start, end, user=""):
+        with self._read() as conn:
+            return conn.execute(
+                "SELECT date, day, program FROM day_stats WHERE user = ? AND date BETWEEN ? AND ? ORDER BY date, day",
+                (user, start, end),
+            ).fetchall()
+
+    def latest_session(self, day, before, user=""):
+        with self._read() as conn:
+            row = conn.execute(
+                "SELECT date FROM day_stats WHERE user = ? AND day = ? AND date < ? AND completed > 0 "
+                "ORDER BY date DESC LIMIT 1",
+                (user, day, before),
+            ).fetchone()
+        return row[0] if row else None
+
+    def exercise_counts(self, user=""):
+        with self._read() as conn:
+            return conn.execute(
+                "SELECT day, ex, completed FROM ex_stats WHERE user = ? ORDER BY day, ex", (user,)
+            ).fetchall()
+
+    def version(self, user=""):
+        with self._read() as conn:
+            row = conn.execute("SELECT value FROM revisions WHERE user = ?", (user,)).fetchone()
+        return row[0] if row else 0
+
+    def day_loads(self, d_str, day, user=""):
+        with self._read() as conn:
+            return conn.execute(
+                "SELECT sizes, weights, reps FROM set_loads WHERE user = ? AND date = ? AND day = ?",
+                (user, d_str, day),
+            ).fetchone()
+
+    def set_loads(self, d_str, day, sizes, weights, reps, at=None, user=""):
+        at = time.time() if at is None else at
+        self._submit(_Write(user, [], loads=(d_str, day, bytes(sizes), bytes(weights), bytes(reps), at)))
+
+    def load_items(self, user=""):
+        with self._read() as conn:
+            return conn.execute(
+                "SELECT date, day, sizes, weights, reps FROM set_loads WHERE user = ? ORDER BY date, day", (user,)
+            ).fetchall()
+
+    def has_import(self, digest, user=""):
+        with self._read() as conn:
+            return conn.execute(
+                "SELECT 1 FROM imports WHERE user = ? AND sha256 = ?", (user, digest)
+            ).fetchone() is not None
+
+    def import_rows(self, digest, rows, program=None, user=""):
+        return self._submit(_Write(user, _set_params(user, rows), digest, program=program))
+
+    def close(self):
+        with self._writer_lock:
+            self._writer.close()
+        for conn in self._opened:
+            conn.close()
+
+
+BACKENDS: dict[str, type[ProgressStore]] = {
+    "sqlite": SQLiteStore,
+    "memory": MemoryStore,
+}
+
+
+def open_store(spec: str) -> ProgressStore:
+    """Open a store from a "<backend>:<target>" spec, e.g. "sqlite:progress.db"."""
+    backend, _, target = spec.partition(":")
+    try:
+        factory = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown progress store backend: {backend!r}") from None
+    return factory(target)
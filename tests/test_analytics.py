@@ -0,0 +1,114 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from analytics import exercise_adherence, history_report, load_report, streaks, window_loads
+from plan import Exercise, PlanDay, Program
+
+
+def _program():
+    day = PlanDay("A", "Push", [Exercise("Bench", 3, "5"), Exercise("Press", 3, "5")])
+    return Program("test", "Test", 1, [day])
+
+
+def _loads(days: int):
+    # Both exercises every day for `days` days; weight climbs steadily.
+    dates = np.repeat(pd.date_range("2020-01-01", periods=days).to_numpy(), 2)
+    return pd.DataFrame({
+        "date": dates,
+        "day": "A",
+        "ex": np.tile([0, 1], days),
+        "set": 0,
+        "weight": np.arange(2 * days, dtype=float) + 20,
+        "reps": 5,
+    })
+
+
+def _week(monday: date, *weekdays: int) -> list[date]:
+    return [monday + timedelta(days=d) for d in weekdays]
+
+
+# Monday-started weeks: 2026-01-05, -12, -19, -26, 2026-02-02, -09.
+W1, W2, W3, W4, W5, W6 = (date(2026, 1, 5) + timedelta(weeks=n) for n in range(6))
+
+
+def test_streaks_count_weeks_that_hit_the_weekly_target():
+    dates = _week(W1, 0, 2, 4) + _week(W2, 0, 3) + _week(W3, 1, 2, 6) + _week(W4, 0, 1, 2)
+    # W2 missed the target of three days, so W3-W4 is the run.
+    assert streaks(dates, W5 + timedelta(days=2), per_week=3) == (2, 2)
+    # A week that's still in progress doesn't end the streak; a whole missed week does.
+    assert streaks(dates, W6, per_week=3) == (0, 2)
+    # With one day a week as the target, every week counts.
+    assert streaks(dates, W5, per_week=1) == (4, 4)
+
+
+def test_rest_days_inside_a_week_do_not_break_a_streak():
+    # Monday of one week and Sunday of the next are 13 days apart.
+    assert streaks([W1, W2 + timedelta(days=6)], W3) == (2, 2)
+    assert streaks([], W1) == (0, 0)
+
+
+def test_the_week_in_progress_counts_once_it_hits_the_target():
+    dates = _week(W1, 0, 1, 2) + _week(W2, 0, 1)
+    assert streaks(dates, W2 + timedelta(days=1), per_week=3) == (1, 1)
+    assert streaks(dates + [W2 + timedelta(days=2)], W2 + timedelta(days=2), per_week=3) == (2, 2)
+
+
+def test_history_report_uses_the_programs_weekly_target():
+    program = Program("test", "Test", 1, [PlanDay(k, k, [Exercise("Bench", 1, "5")]) for k in "AB"], per_week=2)
+    days = _week(W1, 0, 3) + _week(W2, 0)
+    sessions = pd.DataFrame({
+        "date": [d.isoformat() for d in days], "day": ["A", "B", "A"], "total_sets": 1, "completed": 1,
+    })
+    report = history_report(sessions, [("A", 0, 2), ("B", 0, 1)], program, W2 + timedelta(days=3))
+    assert (report["current_streak"], report["longest_streak"]) == (1, 1)
+
+
+def test_adherence_pools_an_exercise_across_days():
+    program = Program("test", "Test", 1, [
+        PlanDay("A", "Upper", [Exercise("Bench", 3, "5"), Exercise("Row", 2, "8")]),
+        PlanDay("B", "Lower", [Exercise("Bench", 4, "3"), Exercise("Squat", 5, "5")]),
+    ])
+    sessions = pd.DataFrame({"day": ["A", "A", "B"]})
+    out = exercise_adherence([("A", 0, 5), ("A", 1, 4), ("B", 0, 2)], sessions, program).set_index("exercise")
+
+    # Bench: 3 sets x 2 A sessions + 4 sets x 1 B session.
+    assert out.loc["Bench", ["days", "planned", "completed", "adherence_%"]].tolist() == [2, 10, 7, 70.0]
+    assert out.loc["Row", "adherence_%"] == 100.0
+    assert out.loc["Squat", ["planned", "completed"]].tolist() == [5, 0]
+
+
+def test_adherence_is_blank_for_days_never_trained():
+    program = Program("test", "Test", 1, [PlanDay("A", "A", [Exercise("Bench", 3, "5")]), PlanDay("B", "B", [Exercise("Squat", 3, "5")])])
+    out = exercise_adherence([("A", 0, 3)], pd.DataFrame({"day": ["A"]}), program).set_index("exercise")
+    assert out.loc["Squat", "planned"] == 0 and np.isnan(out.loc["Squat", "adherence_%"])
+
+
+def test_window_clips_and_caps_the_trend():
+    report = load_report(_loads(2000), _program())
+    view = window_loads(report, date(2021, 1, 1), date(2024, 12, 31), max_points=100)
+
+    trend = view["e1rm_trend"]
+    assert trend["date"].min() >= pd.Timestamp("2021-01-01")
+    assert trend["date"].max() <= pd.Timestamp("2024-12-31")
+    assert len(trend) <= 100
+    assert trend.groupby("exercise").size().to_dict() == {"Bench": 50, "Press": 50}
+    # LTTB keeps each line's end points.
+    bench = trend[trend["exercise"] == "Bench"]
+    assert bench["date"].iloc[0] == pd.Timestamp("2021-01-01")
+    assert bench["date"].iloc[-1] == pd.Timestamp("2024-12-31")
+
+    tonnage = view["tonnage"].set_index("exercise")
+    assert tonnage.loc["Bench", "sets"] == (pd.Timestamp("2024-12-31") - pd.Timestamp("2021-01-01")).days + 1
+
+    prs = view["prs"]
+    assert prs["date"].between(pd.Timestamp("2021-01-01"), pd.Timestamp("2024-12-31")).all()
+    assert prs["date"].is_monotonic_decreasing
+
+
+def test_short_windows_are_not_reduced():
+    report = load_report(_loads(10), _program())
+    view = window_loads(report, date(2020, 1, 3), date(2020, 1, 5))
+    assert len(view["e1rm_trend"]) == 6
+    assert len(view["prs"]) == 6
@@ -0,0 +1,138 @@
+import json
+import os
+from datetime import date
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from store import open_store
+from transfer import ExportCache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PLAN = {
+    "name": "tiny",
+    "title": "Tiny",
+    "version": 1,
+    "days": [
+        {"key": "A", "short": "A", "exercises": [{"name": "Squat", "sets": 2, "reps": "5"}, {"name": "Row", "sets": 1, "reps": "8"}]},
+        {"key": "B", "short": "B", "exercises": [{"name": "Bench", "sets": 3, "reps": "5"}]},
+    ],
+}
+WEDNESDAY = date(2026, 1, 7)  # week of Monday 2026-01-05
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    plans = tmp_path / "plans"
+    plans.mkdir()
+    (plans / "tiny.json").write_text(json.dumps(PLAN))
+    monkeypatch.setenv("TRACKER_PLANS", str(plans))
+    monkeypatch.setenv("TRACKER_STORE", f"sqlite:{tmp_path / 'p.db'}")
+    monkeypatch.setenv("TRACKER_WRITE_BEHIND", "0")
+    monkeypatch.delenv("TRACKER_USER", raising=False)
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    store = open_store(f"sqlite:{tmp_path / 'p.db'}")
+
+    def run(selected=WEDNESDAY, day_idx=0):
+        at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60).run()
+        at.date_input[0].set_value(selected)
+        at.selectbox(key="__select_day__").set_value(day_idx)
+        return at.run()
+
+    yield store, run
+    store.close()
+    st.cache_resource.clear()
+
+
+def _click(at, label: str):
+    next(b for b in at.button if b.label == label).click().run()
+    assert not at.exception, at.exception
+
+
+def test_reset_week_clears_every_session_of_that_week_in_one_write(app):
+    store, run = app
+    store.set_many([(d, day, 0, 0, True) for d, day in [
+        ("2026-01-04", "A"), ("2026-01-05", "A"), ("2026-01-09", "B"), ("2026-01-11", "A"), ("2026-01-12", "B"),
+    ]], program="tiny@1")
+    at = run()
+    before = store.version()
+
+    _click(at, "🗓️ Reset this week")
+    assert store.version() == before + 1
+    assert [(d, day, done) for d, day, _, done, _ in store.day_counts()] == [
+        ("2026-01-04", "A", 1), ("2026-01-05", "A", 0), ("2026-01-09", "B", 0), ("2026-01-11", "A", 0), ("2026-01-12", "B", 1),
+    ]
+
+
+def test_mark_range_done_fills_recorded_sessions_only(app):
+    store, run = app
+    store.set_many([("2026-01-05", "A", 0, 0, True), ("2026-01-06", "B", 0, 1, False), ("2026-01-08", "A", 0, 0, False)], program="tiny@1")
+    at = run()
+    at.date_input(key="__bulk_range__").set_value((date(2026, 1, 5), date(2026, 1, 7))).run()
+    before = store.version()
+
+    _click(at, "✅ Mark range done")
+    assert store.version() == before + 1
+    assert store.day_sets("2026-01-05", "A") == {(0, 0): True, (0, 1): True, (1, 0): True}
+    assert store.day_sets("2026-01-06", "B") == {(0, 0): True, (0, 1): True, (0, 2): True}
+    assert store.day_sets("2026-01-07", "A") == {}
+    assert store.day_sets("2026-01-08", "A") == {(0, 0): False}
+
+
+def test_copy_previous_session(app):
+    store, run = app
+    store.set_many([("2026-01-02", "A", 1, 0, True), ("2026-01-05", "A", 0, 1, True), ("2026-01-06", "B", 0, 0, True)], program="tiny@1")
+    at = run()
+
+    _click(at, "📋 Copy last A session")
+    assert store.day_sets("2026-01-07", "A") == {(0, 0): False, (0, 1): True, (1, 0): False}
+    assert [t.value for t in at.toast] == ["Copied 2026-01-05 into 2026-01-07"]
+    # The KPI row already reflects the copy, without another rerun.
+    assert any("1 / 3" in m.value for m in at.markdown if "COMPLETED SETS" in m.value)
+
+
+def test_copy_without_an_earlier_session_writes_nothing(app):
+    store, run = app
+    at = run(day_idx=1)
+    _click(at, "📋 Copy last B session")
+    assert store.version() == 0
+    assert [t.value for t in at.toast] == ["No earlier session of this day to copy."]
+
+
+def test_exports_are_not_built_on_reruns(app, monkeypatch):
+    built = []
+    original = ExportCache.get
+    monkeypatch.setattr(ExportCache, "get", lambda self, *args: built.append(args) or original(self, *args))
+    store, run = app
+    store.set_many([("2026-01-05", "A", 0, 0, True)], program="tiny@1")
+    at = run()
+    at.run()
+    assert len(at.get("download_button")) == 1
+    assert built == []
+
+
+def _summary_range(at):
+    return next(d for d in at.date_input if d.key == "__summary_range__").value
+
+
+def test_default_summary_range_follows_new_sessions(app):
+    store, run = app
+    store.set_many([("2026-01-02", "A", 0, 0, True), ("2026-01-05", "A", 0, 0, True)], program="tiny@1")
+    at = run()
+    at.session_state["__summary_open__"] = True
+    at.run()
+    assert _summary_range(at) == (date(2026, 1, 2), date(2026, 1, 5))
+
+    # A session added later in the same browser session shows up.
+    store.set_many([("2026-01-09", "B", 0, 0, True)], program="tiny@1")
+    at.run()
+    assert _summary_range(at) == (date(2026, 1, 2), date(2026, 1, 9))
+
+    # A range picked by hand is left alone.
+    next(d for d in at.date_input if d.key == "__summary_range__").set_value((date(2026, 1, 5), date(2026, 1, 9))).run()
+    store.set_many([("2026-01-12", "A", 0, 0, True)], program="tiny@1")
+    at.run()
+    assert _summary_range(at) == (date(2026, 1, 5), date(2026, 1, 9))
@@ -0,0 +1,99 @@
+import json
+import os
+
+import pytest
+
+from plan import PlanCatalog, parse_program
+
+
+def _doc(version=1, sets=(3, 2), **extra):
+    return {
+        "name": "split",
+        "version": version,
+        "days": [{"key": "Day 1 – Push", "exercises": [{"name": f"Ex {i}", "sets": n, "reps": 5} for i, n in enumerate(sets)]}],
+        **extra,
+    }
+
+
+def _write(path, doc, mtime_ns=None):
+    path.write_text(json.dumps(doc))
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_parse_program_builds_the_lookups():
+    program = parse_program(_doc(sessions_per_week=4), "plans/split.json")
+    day = program.days["Day 1 – Push"]
+    assert program.ref == "split@1" and program.title == "split" and program.per_week == 4
+    assert day.short == "Day 1" and day.index == {"Ex 0": 0, "Ex 1": 1} and day.layout.sizes == (3, 2)
+    assert day.exercises[0].reps == "5"
+    # The file name stands in for a missing name; per_week defaults to the number of days.
+    unnamed = parse_program({"days": _doc()["days"]}, "plans/other.json")
+    assert unnamed.ref == "other@1" and unnamed.per_week == 1
+
+
+@pytest.mark.parametrize("doc", [
+    [],
+    {"days": []},
+    _doc(version="2"),
+    _doc(sessions_per_week=0),
+    _doc(sessions_per_week=8),
+    _doc(sessions_per_week=2.5),
+    _doc(sets=(3, 0)),
+    _doc(sets=(3, True)),
+    {"days": [{"key": "", "exercises": []}]},
+    {"days": [{"key": "A", "exercises": [{"sets": 3}]}]},
+    {"days": [{"key": "A", "exercises": []}, {"key": "A", "exercises": []}]},
+])
+def test_parse_program_rejects_malformed_documents(doc):
+    with pytest.raises(ValueError):
+        parse_program(doc, "plans/bad.json")
+
+
+def test_catalog_reparses_only_changed_files(tmp_path):
+    _write(tmp_path / "split.json", _doc(), mtime_ns=1_000_000_000)
+    catalog = PlanCatalog(str(tmp_path), check_interval=0)
+    first = catalog.get("split")
+    assert catalog.generation == 1
+
+    assert catalog.refresh() is False
+    assert catalog.get("split") is first and catalog.generation == 1
+
+    # Same size, new mtime: re-read.
+    _write(tmp_path / "split.json", _doc(sets=(3, 4)), mtime_ns=2_000_000_000)
+    assert catalog.refresh() is True
+    assert catalog.get("split").days["Day 1 – Push"].layout.sizes == (3, 4)
+    assert catalog.generation == 2
+
+
+def test_catalog_tracks_versions_and_removals(tmp_path):
+    _write(tmp_path / "split.json", _doc())
+    catalog = PlanCatalog(str(tmp_path), check_interval=0)
+    _write(tmp_path / "split_v2.json", _doc(version=2, sets=(3, 2, 4)))
+    assert catalog.refresh()
+    assert catalog.versions("split") == [1, 2] and catalog.get("split").ref == "split@2"
+    assert catalog.planned_totals() == {("split@1", "Day 1 – Push"): 5, ("split@2", "Day 1 – Push"): 9}
+    assert catalog.day_layout("split@1", "Day 1 – Push").sizes == (3, 2)
+    # Unknown versions fall back to the widest layout any version used.
+    assert catalog.day_layout("split@7", "Day 1 – Push").sizes == (3, 2, 4)
+
+    (tmp_path / "split_v2.json").unlink()
+    assert catalog.refresh() and catalog.generation == 3
+    assert catalog.versions("split") == [1] and catalog.find("split@2") is None
+
+
+def test_catalog_keeps_the_last_good_parse(tmp_path):
+    _write(tmp_path / "split.json", _doc(), mtime_ns=1_000_000_000)
+    catalog = PlanCatalog(str(tmp_path), check_interval=0)
+    (tmp_path / "split.json").write_text("{ half-written")
+    assert catalog.refresh() is False
+    assert catalog.get("split").ref == "split@1" and catalog.generation == 1
+    assert str(tmp_path / "split.json") in catalog.errors
+
+
+def test_catalog_checks_the_directory_at_most_every_interval(tmp_path):
+    _write(tmp_path / "split.json", _doc())
+    catalog = PlanCatalog(str(tmp_path), check_interval=3600)
+    _write(tmp_path / "split_v2.json", _doc(version=2))
+    assert catalog.refresh() is False and catalog.versions("split") == [1]
+    assert catalog.refresh(force=True) and catalog.versions("split") == [1, 2]
@@ -0,0 +1,59 @@
+import random
+
+from progress import DayLayout, DayProgress, load_keys, set_key, set_keys
+
+LAYOUT = DayLayout([3, 2, 4])
+
+
+def _recount(record: DayProgress) -> tuple[int, int]:
+    done = sum(record.is_done(i, s) for i, n in enumerate(LAYOUT.sizes) for s in range(n))
+    full = sum(all(record.is_done(i, s) for s in range(n)) for i, n in enumerate(LAYOUT.sizes))
+    return done, full
+
+
+def test_counters_follow_every_toggle():
+    rng = random.Random(0)
+    record = DayProgress(LAYOUT)
+    for _ in range(500):
+        op = rng.randrange(3)
+        value = rng.random() < 0.6
+        if op == 0:
+            ex_idx = rng.randrange(3)
+            record.set(ex_idx, rng.randrange(LAYOUT.sizes[ex_idx]), value)
+        elif op == 1:
+            record.set_exercise(rng.randrange(3), value)
+        else:
+            record.set_all(value)
+        assert (record.done, record.full) == _recount(record)
+
+
+def test_set_exercise_and_set_all():
+    record = DayProgress(LAYOUT)
+    record.set(0, 1, True)
+    record.set_exercise(2, True)
+    assert (record.done, record.full) == (5, 1)
+    assert record.exercise_done(2) and not record.exercise_done(0)
+
+    record.set_all(True)
+    assert (record.done, record.full) == (LAYOUT.total, 3)
+    record.set_exercise(1, False)
+    assert (record.done, record.full) == (7, 2)
+    record.set_all(False)
+    assert (record.done, record.full, record.mask) == (0, 0, 0)
+
+
+def test_from_sets_ignores_sets_outside_the_layout():
+    record = DayProgress.from_sets(LAYOUT, {(0, 0): True, (0, 2): False, (1, 5): True, (7, 0): True, (1, 1): True})
+    assert (record.done, record.full) == (2, 0)
+    assert record.is_done(0, 0) and record.is_done(1, 1)
+
+
+def test_widget_keys_are_built_once():
+    keys = set_keys("2026-01-05", "A", LAYOUT.sizes)
+    assert keys is set_keys("2026-01-05", "A", LAYOUT.sizes)
+    assert [len(row) for row in keys] == [3, 2, 4]
+    assert keys[2][3] == set_key("2026-01-05", "A", 2, 3)
+    assert load_keys("2026-01-05", "A", LAYOUT.sizes)[1][0] == (
+        "load::2026-01-05::A::ex1::set0::w",
+        "load::2026-01-05::A::ex1::set0::r",
+    )
@@ -0,0 +1,147 @@
+import sqlite3
+import threading
+
+import pytest
+
+from store import _MIGRATIONS, Batch, MemoryStore, SQLiteStore, open_store
+
+
+def _v1_database(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(_MIGRATIONS[0] + "PRAGMA user_version=1;")
+    conn.executemany(
+        "INSERT INTO sets VALUES (?, ?, ?, ?, ?)",
+        [
+            ("2026-01-05", "A", 0, 0, 1),
+            ("2026-01-05", "A", 0, 1, 0),
+            ("2026-01-05", "A", 1, 0, 1),
+            ("2026-01-06", "B", 0, 0, 1),
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_migrates_a_v1_database(tmp_path):
+    path = str(tmp_path / "v1.db")
+    _v1_database(path)
+
+    store = SQLiteStore(path)
+    try:
+        with store._read() as conn:
+            assert conn.execute("PRAGMA user_version").fetchone()[0] == len(_MIGRATIONS)
+        # Existing rows land in the shared "" namespace with their aggregates.
+        assert store.day_sets("2026-01-05", "A") == {(0, 0): True, (0, 1): False, (1, 0): True}
+        assert sorted(store.day_counts()) == [("2026-01-05", "A", 3, 2, None), ("2026-01-06", "B", 1, 1, None)]
+        assert sorted(store.exercise_counts()) == [("A", 0, 1), ("A", 1, 1), ("B", 0, 1)]
+        assert store.day_counts(user="someone") == []
+
+        # Triggers keep the aggregates current after the rebuild.
+        before = store.version()
+        store.set_many([("2026-01-05", "A", 0, 1, True)])
+        assert ("2026-01-05", "A", 3, 3, None) in store.day_counts()
+        assert store.version() > before
+    finally:
+        store.close()
+
+    # Reopening an up-to-date database is a no-op.
+    SQLiteStore(path).close()
+
+
+def test_users_are_isolated(tmp_path):
+    store = open_store(f"sqlite:{tmp_path / 'p.db'}")
+    try:
+        alice, bob = store.for_user("alice"), store.for_user("bob")
+        alice.set_many([("2026-01-05", "A", 0, 0, True)])
+        assert alice.day_sets("2026-01-05", "A") == {(0, 0): True}
+        assert bob.day_sets("2026-01-05", "A") == {}
+        assert bob.version() == 0 and alice.version() == 1
+        assert alice.cache_key() != bob.cache_key()
+    finally:
+        store.close()
+
+
+def test_concurrent_writes_are_all_committed(tmp_path):
+    store = open_store(f"sqlite:{tmp_path / 'p.db'}")
+    try:
+        def writer(n):
+            user = store.for_user(f"u{n % 3}")
+            for s in range(50):
+                user.set_many([(f"2026-01-{n + 1:02d}", "A", 0, s, True)])
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert sum(row[3] for u in range(3) for row in store.day_counts(user=f"u{u}")) == 8 * 50
+    finally:
+        store.close()
+
+
+@pytest.mark.parametrize("spec", ["memory:", "sqlite:{tmp}/p.db"])
+def test_sessions_keep_the_program_they_were_first_written_under(tmp_path, spec):
+    store = open_store(spec.format(tmp=tmp_path)).for_user("al")
+    try:
+        store.set_many([("2026-01-05", "A", 0, 0, True)])
+        store.set_many([("2026-01-06", "A", 0, 0, True)], program="split@1")
+        store.set_many([("2026-01-06", "A", 0, 1, True), ("2026-01-07", "A", 0, 0, True)], program="split@2")
+        with store.batch(program="split@3") as batch:
+            batch.set("2026-01-05", "A", 0, 1, True)
+            batch.set("2026-01-08", "A", 0, 0, True)
+        assert [row[4] for row in store.day_counts()] == [None, "split@1", "split@2", "split@3"]
+        assert store.sessions_between("2026-01-06", "2026-01-06") == [("2026-01-06", "A", "split@1")]
+    finally:
+        store.backend.close()
+
+
+@pytest.mark.parametrize("spec", ["memory:", "sqlite:{tmp}/p.db"])
+def test_sessions_of_one_user_do_not_share_a_program(tmp_path, spec):
+    # Two tabs (or workers) of the same user on different program versions.
+    backend = open_store(spec.format(tmp=tmp_path))
+    try:
+        tab_a, tab_b = backend.for_user(""), backend.for_user("")
+        tab_a.set_many([("2026-01-05", "A", 0, 0, True)], program="five-day-split@1")
+        tab_b.set_many([("2026-01-06", "B", 0, 0, True)], program="other@2")
+        tab_a.set_many([("2026-01-07", "A", 0, 0, True)], program="five-day-split@1")
+        assert [row[4] for row in tab_b.day_counts()] == ["five-day-split@1", "other@2", "five-day-split@1"]
+    finally:
+        backend.close()
+
+
+
+def test_batch_keeps_the_last_change_per_set():
+    batch = Batch("split@1")
+    batch.set("2026-01-05", "A", 0, 0, True)
+    batch.extend([("2026-01-05", "A", 0, 1, True), ("2026-01-05", "A", 0, 0, False)])
+    batch.set("2026-01-06", "B", 0, 0, 1)
+    assert len(batch) == 3
+    assert batch.rows() == [("2026-01-05", "A", 0, 0, False), ("2026-01-05", "A", 0, 1, True), ("2026-01-06", "B", 0, 0, True)]
+
+
+def test_batch_is_one_write_and_nothing_on_error():
+    store = MemoryStore().for_user("al")
+    with store.batch(program="split@1") as batch:
+        for s in range(4):
+            batch.set("2026-01-05", "A", 0, s, True)
+        batch.set("2026-01-05", "A", 0, 3, False)
+    assert store.version() == 1
+    assert store.day_counts() == [("2026-01-05", "A", 4, 3, "split@1")]
+
+    with pytest.raises(RuntimeError):
+        with store.batch() as batch:
+            batch.set("2026-01-06", "A", 0, 0, True)
+            raise RuntimeError("cancelled")
+    with store.batch():
+        pass
+    assert store.version() == 1 and store.day_sets("2026-01-06", "A") == {}
+
+def test_import_is_applied_once(tmp_path):
+    store = open_store(f"sqlite:{tmp_path / 'p.db'}")
+    try:
+        rows = [("2026-01-05", "A", 0, 0, True)]
+        assert store.import_rows("digest", rows) is True
+        assert store.import_rows("digest", rows) is False
+        assert store.has_import("digest") and not store.has_import("digest", user="other")
+    finally:
+        store.close()
@@ -0,0 +1,87 @@
+import gzip
+import io
+import json
+
+import pytest
+
+from progress import DayLayout
+from store import MemoryStore
+from transfer import EXPORT_FORMATS, ExportCache, _JsonStream, import_progress
+
+LAYOUTS = {"A": DayLayout([3, 2]), "B": DayLayout([4])}
+
+DOC = {
+    "chk::2026-01-05::A::ex0::set0": True,
+    "unicode é 🏋️ \"quoted\" \\ \n": [1234567890123, -0.000125, 6.02e23, "x" * 300, None, False],
+    "nested": {"a": [[], {}, [{"b": "ü" * 50}]], "n": 98765.4321},
+}
+
+
+def _walk(stream):
+    first = stream.peek()
+    if first == "{":
+        return {key: _walk(stream) for key in stream.object_keys()}
+    if first == "[":
+        return [_walk(stream) for _ in stream.array_items()]
+    return stream.value()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 64])
+@pytest.mark.parametrize("bom", [b"", b"\xef\xbb\xbf"])
+def test_tokenizer_values_across_chunk_boundaries(chunk_size, bom):
+    # Every value, key, escape and multi-byte character straddles some
+    # boundary at these chunk sizes.
+    data = bom + json.dumps(DOC, ensure_ascii=False, indent=1).encode()
+    assert _walk(_JsonStream(io.BytesIO(data), chunk_size=chunk_size)) == DOC
+
+
+def test_tokenizer_reports_truncated_input():
+    stream = _JsonStream(io.BytesIO(b'{"a": [1, 2'), chunk_size=3)
+    with pytest.raises(ValueError):
+        _walk(stream)
+
+
+def _source():
+    store = MemoryStore()
+    store.set_many([
+        ("2026-01-05", "A", 0, 0, True), ("2026-01-05", "A", 1, 1, True), ("2026-01-05", "A", 0, 2, False),
+        ("2026-01-06", "B", 0, 3, True),
+    ])
+    return store
+
+
+@pytest.mark.parametrize("fmt", [f for f in EXPORT_FORMATS if f.startswith(("JSON", "NDJSON"))])
+def test_exports_import_back(fmt):
+    data = ExportCache(LAYOUTS).get(_source(), fmt)
+    target = MemoryStore()
+    result = import_progress(target, io.BytesIO(data), LAYOUTS)
+    assert result.rejected == 0 and not result.duplicate
+    done = sorted(row[:4] for row in target.items() if row[4])
+    assert done == [("2026-01-05", "A", 0, 0), ("2026-01-05", "A", 1, 1), ("2026-01-06", "B", 0, 3)]
+    assert import_progress(target, io.BytesIO(data), LAYOUTS).duplicate
+
+
+def test_import_rejects_bad_entries():
+    doc = {
+        "chk::2026-01-05::A::ex0::set0": True,
+        "chk::2026-01-05::A::ex9::set0": True,   # outside the plan
+        "chk::2026-13-40::A::ex0::set0": True,   # not a date
+        "chk::2026-01-05::A::ex0::set1": "yes",  # not a bool
+    }
+    result = import_progress(MemoryStore(), io.BytesIO(json.dumps(doc).encode()), LAYOUTS)
+    assert (result.rows, result.rejected) == (1, 3)
+
+
+def test_bitmask_sessions_are_checked_before_decoding():
+    sessions = [
+        {"date": "2026-01-05", "day": "X", "layout": [3000000], "mask": "1"},
+        {"date": "2026-01-05", "day": "X", "layout": [2]},
+        {"date": "2026-01-05", "day": "X", "layout": [2], "mask": "zz"},
+        {"date": "2026-01-05", "day": "X", "layout": [2], "mask": "fff"},
+        {"date": "2026-01-05", "day": "X", "layout": [2], "mask": "3"},
+        # A known day only yields the sets its plan layout has.
+        {"date": "2026-01-05", "day": "B", "layout": [60], "mask": "f"},
+    ]
+    data = gzip.compress(json.dumps({"format": "bitmask-v1", "sessions": sessions}).encode())
+    result = import_progress(MemoryStore(), io.BytesIO(data), LAYOUTS)
+    assert (result.rows, result.rejected) == (2 + 4, 4)
@@ -0,0 +1,195 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import time
+
+import pytest
+
+from progress import DayLayout, DayLoads
+from store import MemoryStore, open_store
+from writebehind import WriteBehindStore, replay
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _SpyStore(MemoryStore):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+        self.load_writes = 0
+        self.fail = False
+
+    def set_loads(self, d_str, day, sizes, weights, reps, at=None, user=""):
+        self.load_writes += 1
+        super().set_loads(d_str, day, sizes, weights, reps, at=at, user=user)
+
+    def set_many(self, rows, program=None, user=""):
+        if self.fail:
+            raise OSError("disk full")
+        rows = list(rows)
+        self.batches.append(rows)
+        super().set_many(rows, program=program, user=user)
+
+
+@pytest.fixture
+def spy(tmp_path):
+    backend = _SpyStore()
+    store = WriteBehindStore(backend, str(tmp_path / "journal"), interval=60)
+    yield store, backend
+    backend.fail = False
+    store.close()
+
+
+def test_taps_coalesce_into_one_batch(spy):
+    store, backend = spy
+    user = store.for_user("al")
+    for i in range(200):
+        user.set_many([("2026-01-05", "A", i % 7, i % 4, i % 2 == 0)])
+
+    # Nothing reached the backend yet, but reads see the queued state.
+    assert backend.batches == []
+    assert len(user.day_sets("2026-01-05", "A")) == 28
+    assert user.version() == 200
+
+    store.flush()
+    assert len(backend.batches) == 1 and len(backend.batches[0]) == 28
+    assert backend.day_sets("2026-01-05", "A", user="al") == user.day_sets("2026-01-05", "A")
+
+
+def test_load_edits_are_queued_and_coalesced(spy):
+    store, backend = spy
+    layout = DayLayout([2])
+    loads = DayLoads(layout)
+    for reps in range(1, 11):
+        loads.set(0, 1, 60.0, reps)
+        store.set_loads("2026-01-05", "A", *loads.to_bytes())
+
+    assert backend.load_writes == 0
+    assert DayLoads.from_bytes(layout, store.day_loads("2026-01-05", "A")).get(0, 1) == (60.0, 10)
+    assert store.load_items() == [("2026-01-05", "A", *loads.to_bytes())]
+    assert backend.load_writes == 1
+
+
+def test_aggregate_reads_flush_first(spy):
+    store, backend = spy
+    store.set_many([("2026-01-05", "A", 0, 0, True)])
+    assert store.day_counts() == [("2026-01-05", "A", 1, 1, None)]
+    assert len(backend.batches) == 1
+
+
+def test_failed_batch_is_kept_and_retried(spy, tmp_path):
+    store, backend = spy
+    store.interval = 0.01
+    backend.fail = True
+    store.set_many([("2026-01-05", "A", 0, 0, True)])
+    with pytest.raises(OSError):
+        store.flush()
+    assert store.day_sets("2026-01-05", "A") == {(0, 0): True}
+    assert os.listdir(tmp_path / "journal")
+
+    backend.fail = False
+    store.flush()
+    assert backend.day_sets("2026-01-05", "A") == {(0, 0): True}
+
+
+def _child(db: str, journal: str, body: str) -> subprocess.Popen:
+    code = textwrap.dedent(f"""
+        import os, sys
+        sys.path.insert(0, {ROOT!r})
+        from store import open_store
+        from writebehind import WriteBehindStore
+        wb = WriteBehindStore(open_store({'sqlite:' + db!r}), {journal!r}, interval=60)
+    """) + textwrap.dedent(body)
+    return subprocess.Popen([sys.executable, "-c", code], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+
+
+def test_journal_is_replayed_after_a_crash(tmp_path):
+    db, journal = str(tmp_path / "p.db"), str(tmp_path / "journal")
+    child = _child(db, journal, """
+        user = wb.for_user("bo")
+        user.set_many([("2026-02-01", "B", 0, s, True) for s in range(5)], program="split@3")
+        user.set_many([("2026-02-01", "B", 0, 1, False)])
+        user.set_loads("2026-02-01", "B", b"\\x01\\x00", b"\\x00\\x00\\x70\\x42", b"\\x05\\x00")
+        print("queued", flush=True)
+        sys.stdin.readline()
+        os._exit(1)  # no flush, no atexit
+    """)
+    try:
+        assert child.stdout.readline().strip() == "queued"
+        # A live process's journal is never replayed by another one.
+        other = WriteBehindStore(open_store(f"sqlite:{db}"), journal)
+        assert other.replayed == 0
+        other.close()
+    finally:
+        child.stdin.write("\n")
+        child.stdin.close()
+        child.wait()
+
+    store = WriteBehindStore(open_store(f"sqlite:{db}"), journal)
+    try:
+        assert store.replayed == 6
+        assert store.backend.day_loads("2026-02-01", "B", user="bo") == (b"\x01\x00", b"\x00\x00\x70\x42", b"\x05\x00")
+        assert store.backend.day_sets("2026-02-01", "B", user="bo") == {
+            (0, 0): True, (0, 1): False, (0, 2): True, (0, 3): True, (0, 4): True,
+        }
+        assert store.backend.day_counts(user="bo") == [("2026-02-01", "B", 5, 4, "split@3")]
+    finally:
+        store.close()
+    assert os.listdir(journal) == []
+
+
+def test_replay_ignores_a_torn_last_line(tmp_path):
+    journal = tmp_path / "journal"
+    journal.mkdir()
+    lines = [json.dumps(["", "2026-01-05", "A", 0, s, True]) for s in range(3)]
+    (journal / "123.abcd-00000001.log").write_text("\n".join(lines) + '\n["", "2026-01-05", "A", 0,')
+
+    backend = MemoryStore()
+    assert replay(str(journal), backend) == 3
+    assert backend.day_sets("2026-01-05", "A") == {(0, 0): True, (0, 1): True, (0, 2): True}
+    assert list(journal.iterdir()) == []
+
+
+@pytest.mark.parametrize("spec", ["memory:", "sqlite:{tmp}/p.db"])
+def test_replay_skips_changes_overwritten_since(tmp_path, spec):
+    # A dead worker journaled X=True; a live one has since written X=False.
+    journal = tmp_path / "journal"
+    journal.mkdir()
+    stale = time.time() - 60
+    (journal / "123.abcd-00000001.log").write_text(
+        json.dumps(["", "2026-01-05", "A", 0, 0, True, None, stale]) + "\n"
+        + json.dumps(["", "2026-01-05", "A", 0, 1, True, None, stale]) + "\n"
+        + json.dumps(["", "2026-01-05", "A", [b"\x01\x00".hex(), b"\x00\x00\x70\x42".hex(), b"\x05\x00".hex()], stale]) + "\n"
+    )
+    backend = open_store(spec.format(tmp=tmp_path))
+    try:
+        backend.set_many([("2026-01-05", "A", 0, 0, False)])
+        backend.set_loads("2026-01-05", "A", b"\x01\x00", b"\x00\x00\x20\x42", b"\x08\x00")
+
+        replay(str(journal), backend)
+        assert backend.day_sets("2026-01-05", "A") == {(0, 0): False, (0, 1): True}
+        assert backend.day_loads("2026-01-05", "A") == (b"\x01\x00", b"\x00\x00\x20\x42", b"\x08\x00")
+    finally:
+        backend.close()
+
+
+def test_orphaned_segments_are_replayed_without_a_restart(tmp_path):
+    journal = tmp_path / "journal"
+    store = WriteBehindStore(MemoryStore(), str(journal), orphan_interval=0.05)
+    try:
+        store.set_many([("2026-01-05", "A", 0, 0, True)])
+        # Left behind by a worker that died after this one started.
+        (journal / "123.abcd-00000001.log").write_text(json.dumps(["", "2026-01-06", "B", 0, 0, True, None, time.time()]) + "\n")
+
+        deadline = time.monotonic() + 5
+        while store.backend.day_sets("2026-01-06", "B") == {} and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert store.backend.day_sets("2026-01-06", "B") == {(0, 0): True}
+        assert store.replayed == 1
+        # This process's own live segment is never picked up as an orphan.
+        assert store.day_sets("2026-01-05", "A") == {(0, 0): True}
+        assert not (journal / "123.abcd-00000001.log").exists()
+    finally:
+        store.close()
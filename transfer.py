@@ -0,0 +1,371 @@
+# Workout Progress Tracker — progress import/export
+# Imports stream the upload: the JSON is tokenised chunk by chunk, rows are
+# validated in batches and the result lands in the store as one write that is
+# recorded by content hash, so re-uploading (or Streamlit re-delivering) the
+# same file is a no-op.
+# Exports are only generated when someone downloads them and are cached per
+# store revision; besides the legacy JSON there are compact NDJSON, gzip, CSV
+# and (with pyarrow installed) Parquet flavours.
+
+import codecs
+import csv
+import gzip
+import hashlib
+import io
+import json
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator
+from datetime import date
+from typing import NamedTuple
+
+from progress import DayLayout, decode_session, encode_bitmask, set_key
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = pq = None
+
+CHUNK_SIZE = 1 << 16
+BATCH_SIZE = 5000
+
+_WS = re.compile(r"[ \t\n\r]*")
+_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*")
+
+
+class ImportResult(NamedTuple):
+    digest: str
+    rows: int
+    rejected: int
+    duplicate: bool
+
+
+def parse_set_key(key: str):
+    """Inverse of set_key: (date, day, ex_idx, set_idx), or None if malformed."""
+    try:
+        prefix, d_str, day, ex_part, set_part = key.split("::")
+        if prefix != "chk" or not ex_part.startswith("ex") or not set_part.startswith("set"):
+            return None
+        return d_str, day, int(ex_part[2:]), int(set_part[3:])
+    except ValueError:
+        return None
+
+
+def file_digest(fp, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a binary file object, read in chunks; rewinds it afterwards."""
+    digest = hashlib.sha256()
+    fp.seek(0)
+    for chunk in iter(lambda: fp.read(chunk_size), b""):
+        digest.update(chunk)
+    fp.seek(0)
+    return digest.hexdigest()
+
+
+class _JsonStream:
+    """Minimal pull tokenizer: walks containers incrementally and only fully
+    decodes the leaf values it is asked for."""
+
+    def __init__(self, fp, chunk_size: int = CHUNK_SIZE):
+        self._fp = fp
+        self._chunk_size = chunk_size
+        self._text = codecs.getincrementaldecoder("utf-8-sig")()
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        raw = self._fp.read(self._chunk_size)
+        if not raw:
+            self._eof = True
+            self._buf = self._buf[self._pos:] + self._text.decode(b"", final=True)
+            self._pos = 0
+            return False
+        self._buf = self._buf[self._pos:] + self._text.decode(raw)
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character, or "" at end of input."""
+        while True:
+            self._pos = _WS.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} but found {found or 'end of file'!r}")
+        self._pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A value running up to the end of the buffer may continue in the
+            # next chunk, and so may a number cut off at "6." or "6.02e",
+            # which decodes as a shorter number.
+            tail = _NUMBER_TAIL.match(self._buf, end).end() if type(value) in (int, float) else end
+            if tail == len(self._buf) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def _members(self, close: str):
+        if self.peek() == close:
+            self._pos += 1
+            return
+        while True:
+            yield
+            sep = self.peek()
+            if sep == close:
+                self._pos += 1
+                return
+            self.expect(",")
+
+    def object_keys(self) -> Iterator[str]:
+        """Iterate an object's keys; the caller consumes each value."""
+        self.expect("{")
+        for _ in self._members("}"):
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError("Object keys must be strings")
+            self.expect(":")
+            yield key
+
+    def array_items(self) -> Iterator[None]:
+        """Iterate an array's items; the caller consumes each one."""
+        self.expect("[")
+        yield from self._members("]")
+
+
+class _CountingReader:
+    def __init__(self, fp, on_read: Callable[[int], None] | None):
+        self._fp = fp
+        self._on_read = on_read
+
+    def read(self, n: int = -1) -> bytes:
+        chunk = self._fp.read(n)
+        if self._on_read and chunk:
+            self._on_read(len(chunk))
+        return chunk
+
+
+_NDJSON_FIELDS = ("date", "day", "exercise", "set", "done")
+
+
+def iter_records(fp, on_read: Callable[[int], None] | None = None, layouts: dict[str, DayLayout] | None = None) -> Iterator[tuple]:
+    """Stream raw records out of any JSON export, gzip-compressed or not.
+
+    Handles the legacy key-per-set object, the bitmask document and NDJSON
+    (a sequence of one-object-per-set lines). Yields (date, day, ex_idx,
+    set_idx, done) tuples, unvalidated; entries that can't be read as a set,
+    and whole bitmask sessions that fail decode_session()'s checks, are
+    yielded as None so they can be counted.
+    """
+    magic = fp.read(2)
+    fp.seek(0)
+    source = _CountingReader(fp, on_read)
+    if magic == b"\x1f\x8b":
+        source = gzip.GzipFile(fileobj=source, mode="rb")
+
+    stream = _JsonStream(source)
+    if stream.peek() != "{":
+        raise ValueError("Invalid file structure.")
+    # Every top-level object is walked the same way: a legacy or bitmask
+    # export is a single object, NDJSON is many small ones.
+    while stream.peek():
+        fields = {}
+        for key in stream.object_keys():
+            if key == "sessions":
+                for _ in stream.array_items():
+                    rows = decode_session(stream.value(), layouts)
+                    if rows is None:
+                        yield None
+                    else:
+                        yield from rows
+            elif key.startswith("chk::"):
+                value = stream.value()
+                parsed = parse_set_key(key)
+                yield (*parsed, value) if parsed else None
+            elif key in _NDJSON_FIELDS:
+                fields[key] = stream.value()
+            else:
+                stream.value()
+        if fields:
+            try:
+                yield tuple(fields[k] for k in _NDJSON_FIELDS)
+            except KeyError:
+                yield None
+
+
+def normalize_batch(batch: list, layouts: dict[str, DayLayout], seen_dates: dict[str, bool]) -> list[tuple]:
+    """Keep well-formed rows whose date parses and whose indexes fit the plan."""
+    rows = []
+    for record in batch:
+        if record is None:
+            continue
+        d_str, day, ex_idx, set_idx, done = record
+        if not (isinstance(done, bool) and isinstance(d_str, str) and isinstance(day, str)
+                and type(ex_idx) is int and type(set_idx) is int):
+            continue
+        if ex_idx < 0 or set_idx < 0:
+            continue
+        ok = seen_dates.get(d_str)
+        if ok is None:
+            try:
+                ok = seen_dates[d_str] = date.fromisoformat(d_str).isoformat() == d_str
+            except (TypeError, ValueError):
+                ok = seen_dates[d_str] = False
+        if not ok:
+            continue
+        layout = layouts.get(day)
+        if layout is not None and (ex_idx >= len(layout.sizes) or set_idx >= layout.sizes[ex_idx]):
+            continue
+        rows.append((d_str, day, ex_idx, set_idx, done))
+    return rows
+
+
+def import_progress(
+    store,
+    fp,
+    layouts: dict[str, DayLayout],
+    size: int | None = None,
+    on_progress: Callable[[float], None] | None = None,
+    batch_size: int = BATCH_SIZE,
+    program: str | None = None,
+) -> ImportResult:
+    """Stream a progress file from the binary file object `fp` into `store`.
+
+    `on_progress` receives the fraction of `size` bytes parsed so far; new
+    sessions are recorded under `program` (see ProgressStore.set_many).
+    """
+    digest = file_digest(fp)
+    if store.has_import(digest):
+        return ImportResult(digest, 0, 0, True)
+
+    read = 0
+
+    def on_read(n: int):
+        nonlocal read
+        read += n
+        if on_progress and size:
+            on_progress(min(read / size, 1.0))
+
+    rows, batch, seen, total = [], [], {}, 0
+    for record in iter_records(fp, on_read=on_read, layouts=layouts):
+        batch.append(record)
+        if len(batch) >= batch_size:
+            total += len(batch)
+            rows.extend(normalize_batch(batch, layouts, seen))
+            batch.clear()
+    total += len(batch)
+    rows.extend(normalize_batch(batch, layouts, seen))
+
+    applied = store.import_rows(digest, rows, program=program)
+    return ImportResult(digest, len(rows) if applied else 0, total - len(rows), not applied)
+
+
+# ---------------------------------
+# Export
+# ---------------------------------
+def write_json(rows: Iterable[tuple], out, layouts) -> None:
+    # Legacy key-per-set document, byte-for-byte what json.dumps(indent=2)
+    # produced, but written row by row.
+    out.write(b"{")
+    sep = b"\n  "
+    for d_str, day, ex_idx, set_idx, done in rows:
+        out.write(sep + json.dumps(set_key(d_str, day, ex_idx, set_idx)).encode() + (b": true" if done else b": false"))
+        sep = b",\n  "
+    out.write(b"\n}" if sep != b"\n  " else b"}")
+
+
+def write_bitmask(rows: Iterable[tuple], out, layouts) -> None:
+    out.write(json.dumps(encode_bitmask(rows, layouts), separators=(",", ":")).encode())
+
+
+def write_ndjson(rows: Iterable[tuple], out, layouts) -> None:
+    for record in rows:
+        out.write(json.dumps(dict(zip(_NDJSON_FIELDS, record)), separators=(",", ":")).encode() + b"\n")
+
+
+def write_ndjson_gzip(rows: Iterable[tuple], out, layouts) -> None:
+    with gzip.GzipFile(fileobj=out, mode="wb", mtime=0) as gz:
+        write_ndjson(rows, gz, layouts)
+
+
+def write_csv(rows: Iterable[tuple], out, layouts) -> None:
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="", write_through=True)
+    writer = csv.writer(text, lineterminator="\n")
+    writer.writerow(_NDJSON_FIELDS)
+    writer.writerows((d_str, day, ex_idx, set_idx, int(done)) for d_str, day, ex_idx, set_idx, done in rows)
+    text.detach()
+
+
+def write_parquet(rows: Iterable[tuple], out, layouts) -> None:
+    columns = list(zip(*rows)) or [(), (), (), (), ()]
+    table = pa.table({
+        "date": pa.array(columns[0], pa.string()).dictionary_encode(),
+        "day": pa.array(columns[1], pa.string()).dictionary_encode(),
+        "exercise": pa.array(columns[2], pa.int16()),
+        "set": pa.array(columns[3], pa.int16()),
+        "done": pa.array(columns[4], pa.bool_()),
+    })
+    pq.write_table(table, out, compression="zstd")
+
+
+class ExportFormat(NamedTuple):
+    file_name: str
+    mime: str
+    write: Callable
+
+
+EXPORT_FORMATS: dict[str, ExportFormat] = {
+    "JSON (per set)": ExportFormat("workout_progress.json", "application/json", write_json),
+    "JSON (compact bitmask)": ExportFormat("workout_progress.bitmask.json", "application/json", write_bitmask),
+    "NDJSON": ExportFormat("workout_progress.ndjson", "application/x-ndjson", write_ndjson),
+    "NDJSON (gzip)": ExportFormat("workout_progress.ndjson.gz", "application/gzip", write_ndjson_gzip),
+    "CSV": ExportFormat("workout_progress.csv", "text/csv", write_csv),
+}
+if pq is not None:
+    EXPORT_FORMATS["Parquet"] = ExportFormat("workout_progress.parquet", "application/vnd.apache.parquet", write_parquet)
+
+
+class ExportCache:
+    """Generated export bytes keyed by (store namespace, format, revision).
+
+    Shared by every session of the process; a handful of recent entries is
+    kept so flipping between formats doesn't regenerate anything.
+    """
+
+    def __init__(self, layouts: dict[str, DayLayout], max_entries: int = 4):
+        self._layouts = layouts
+        self._max_entries = max_entries
+        self._entries: OrderedDict[tuple, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, store, fmt: str) -> bytes:
+        key = (store.cache_key(), fmt, store.version())
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        out = io.BytesIO()
+        EXPORT_FORMATS[fmt].write(store.items(), out, self._layouts)
+        data = out.getvalue()
+        with self._lock:
+            self._entries[key] = data
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return data
@@ -0,0 +1,436 @@
+# Workout Progress Tracker — write-behind persistence
+# Set changes and logged loads are appended to a journal and queued in
+# memory, then written to the real store by a background thread in coalesced
+# batches, so ticking a set or typing a weight never waits on the database.
+# Journal segments only disappear once their batch is committed, and a dead
+# process's segments are replayed on startup and by any live process's
+# flusher, so a tick the UI has shown survives the process dying before it
+# reached the store. Replayed changes keep their original time and never
+# undo a newer write.
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # no advisory locks: assume one process per journal
+    fcntl = None
+
+from store import ProgressStore
+
+FLUSH_INTERVAL = 0.25  # seconds a change may wait for its batch
+MAX_BATCH = 2000       # queued changes that trigger an immediate flush
+MAX_PENDING = 20000    # writers wait for the flusher beyond this many
+ORPHAN_INTERVAL = 30.0  # seconds between looks for dead processes' segments
+
+# (user, date, day) -> {(ex_idx, set_idx): (done, time.time() of the change)}
+Changes = dict[tuple[str, str, str], dict[tuple[int, int], tuple[bool, float]]]
+# (user, date, day) -> program the session is created under if it's new
+Programs = dict[tuple[str, str, str], str | None]
+# (user, date, day) -> latest (sizes, weights, reps) blobs and their time
+LoadChanges = dict[tuple[str, str, str], tuple[tuple[bytes, bytes, bytes], float]]
+
+
+class _Segment:
+    __slots__ = ("path", "fd", "size")
+
+    def __init__(self, path: str, fd: int):
+        self.path = path
+        self.fd = fd
+        self.size = 0
+
+
+class Journal:
+    """Append-only log of queued changes, one segment per flushed batch.
+
+    Segments are named <owner>-<seq>.log and stay locked by the process that
+    writes them, so any segment another process can lock was left behind by
+    one that died. Every line carries the time.time() of its change.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.owner = f"{os.getpid()}.{uuid.uuid4().hex[:8]}"
+        self._seq = 0
+        self._current = self._open()
+
+    def _open(self) -> _Segment:
+        self._seq += 1
+        path = os.path.join(self.directory, f"{self.owner}-{self._seq:08d}.log")
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        return _Segment(path, fd)
+
+    def append(self, user: str, rows, program: str | None) -> None:
+        # A plain write lands in the OS page cache, which outlives the
+        # process; like synchronous=NORMAL it isn't fsynced per change.
+        self._write("".join(
+            json.dumps([user, *row[:5], program, row[5]], separators=(",", ":")) + "\n" for row in rows
+        ))
+
+    def append_loads(self, user: str, d_str: str, day: str, blobs: tuple[bytes, bytes, bytes], at: float) -> None:
+        # Five fields instead of eight; the blobs go in as hex.
+        self._write(json.dumps([user, d_str, day, [b.hex() for b in blobs], at], separators=(",", ":")) + "\n")
+
+    def _write(self, text: str) -> None:
+        data = text.encode()
+        os.write(self._current.fd, data)
+        self._current.size += len(data)
+
+    def rotate(self) -> _Segment:
+        """Start a new segment; returns the old one for discard() once its batch is safe."""
+        old, self._current = self._current, self._open()
+        return old
+
+    @staticmethod
+    def discard(segment: _Segment) -> None:
+        # Unlink while still holding the lock so nobody replays it in between.
+        try:
+            os.unlink(segment.path)
+        except FileNotFoundError:
+            pass
+        os.close(segment.fd)
+
+    def close(self) -> None:
+        if self._current.size:
+            os.close(self._current.fd)
+        else:
+            self.discard(self._current)
+
+
+def _segment_order(name: str):
+    owner, _, seq = name[:-len(".log")].rpartition("-")
+    return owner, int(seq)
+
+
+def replay(directory: str, store: ProgressStore, skip_owner: str = "") -> int:
+    """Apply segments left behind by dead processes to `store`; returns rows applied.
+
+    Changes keep their original times, so any the store has seen a newer
+    write for since are skipped. `skip_owner` names the calling process's
+    own journal, which it must not replay while it's still writing it.
+    """
+    if not os.path.isdir(directory):
+        return 0
+    names = sorted(
+        (n for n in os.listdir(directory) if n.endswith(".log") and _segment_order(n)[0] != skip_owner),
+        key=_segment_order,
+    )
+    applied = 0
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            fd = os.open(path, os.O_RDWR)
+        except FileNotFoundError:
+            continue
+        try:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # a live process still owns it
+            if os.fstat(fd).st_nlink == 0:
+                continue  # flushed and discarded while we waited
+            with os.fdopen(os.dup(fd), "rb") as fh:
+                changes, programs, loads = _read_segment(fh)
+            for (user, program), rows in _rows_by_writer(changes, programs).items():
+                store.set_many(rows, program=program, user=user)
+                applied += len(rows)
+            for (user, d_str, day), (blobs, at) in loads.items():
+                store.set_loads(d_str, day, *blobs, at=at, user=user)
+                applied += 1
+            os.unlink(path)
+        finally:
+            os.close(fd)
+    return applied
+
+
+def _read_segment(fh) -> tuple[Changes, Programs, LoadChanges]:
+    changes: Changes = {}
+    programs: Programs = {}
+    loads: LoadChanges = {}
+    # Segments written before lines carried a time replay as of now; before
+    # sets carried a program, without one.
+    now = time.time()
+    for line in fh:
+        try:
+            record = json.loads(line)
+            if len(record) in (4, 5):
+                user, d_str, day, blobs, *at = record
+                loads[(user, d_str, day)] = (tuple(bytes.fromhex(b) for b in blobs), at[0] if at else now)
+                continue
+            record.extend((None, now)[len(record) - 6:])
+            user, d_str, day, ex_idx, set_idx, done, program, at = record
+        except ValueError:
+            break  # torn final line from a crash mid-append
+        programs.setdefault((user, d_str, day), program)
+        changes.setdefault((user, d_str, day), {})[(ex_idx, set_idx)] = (bool(done), at)
+    return changes, programs, loads
+
+
+def _rows_by_writer(changes: Changes, programs: Programs) -> dict[tuple[str, str | None], list[tuple]]:
+    # One set_many() per (user, program), so every new session is created
+    # under the program it was first ticked with. Rows keep their times.
+    out: dict[tuple[str, str | None], list[tuple]] = {}
+    for (user, d_str, day), sets in changes.items():
+        rows = out.setdefault((user, programs.get((user, d_str, day))), [])
+        rows.extend((d_str, day, ex_idx, set_idx, done, at) for (ex_idx, set_idx), (done, at) in sets.items())
+    return out
+
+
+class WriteBehindStore(ProgressStore):
+    """Wraps a backend so set_many() and set_loads() return as soon as the
+    change is journaled.
+
+    Rapid toggles of the same set collapse into one pending change (and
+    repeated load edits of a session into its latest arrays), and the
+    flusher writes everything queued within FLUSH_INTERVAL (or MAX_BATCH
+    changes) as one batch. day_sets() and day_loads() overlay queued changes
+    so the UI reads its own writes; whole-history reads and imports flush
+    first. Every ORPHAN_INTERVAL the flusher also replays segments that a
+    dead process left behind, so they don't wait for a restart.
+    """
+
+    def __init__(
+        self,
+        backend: ProgressStore,
+        journal_dir: str,
+        interval: float = FLUSH_INTERVAL,
+        max_batch: int = MAX_BATCH,
+        max_pending: int = MAX_PENDING,
+        orphan_interval: float = ORPHAN_INTERVAL,
+    ):
+        self.backend = backend
+        self.interval = interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.orphan_interval = orphan_interval
+        self.replayed = replay(journal_dir, backend)
+        self._journal = Journal(journal_dir)
+        self._orphans_at = time.monotonic() + orphan_interval
+        self._pending: Changes = {}
+        self._pending_programs: Programs = {}
+        self._pending_loads: LoadChanges = {}
+        self._pending_count = 0
+        self._queued: dict[str, int] = {}
+        self._inflight: Changes = {}
+        self._inflight_loads: LoadChanges = {}
+        self._failed: list[_Segment] = []
+        self._first_at = 0.0
+        self._flush_wanted = False
+        self._error: Exception | None = None
+        self._failures = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="progress-write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def set_many(self, rows, program=None, user=""):
+        now = time.time()
+        rows = [(*row[:5], row[5] if len(row) > 5 else now) for row in rows]
+        if not rows:
+            return
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("write-behind store is closed")
+            while self._pending_count >= self.max_pending:
+                self._cond.wait()
+            self._journal.append(user, rows, program)
+            self._queued[user] = self._queued.get(user, 0) + 1
+            if not self._pending_count:
+                self._first_at = time.monotonic()
+            for d_str, day, ex_idx, set_idx, done, at in rows:
+                self._pending_programs.setdefault((user, d_str, day), program)
+                sets = self._pending.setdefault((user, d_str, day), {})
+                self._pending_count += (ex_idx, set_idx) not in sets
+                sets[(ex_idx, set_idx)] = (bool(done), at)
+            self._cond.notify_all()
+
+    def set_loads(self, d_str, day, sizes, weights, reps, at=None, user=""):
+        blobs = (bytes(sizes), bytes(weights), bytes(reps))
+        at = time.time() if at is None else at
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("write-behind store is closed")
+            while self._pending_count >= self.max_pending:
+                self._cond.wait()
+            self._journal.append_loads(user, d_str, day, blobs, at)
+            self._queued[user] = self._queued.get(user, 0) + 1
+            if not self._pending_count:
+                self._first_at = time.monotonic()
+            self._pending_count += (user, d_str, day) not in self._pending_loads
+            self._pending_loads[(user, d_str, day)] = (blobs, at)
+            self._cond.notify_all()
+
+    def _flush_due(self) -> bool:
+        return bool(self._pending_count) and (
+            time.monotonic() >= self._first_at + self.interval
+            or self._pending_count >= self.max_batch
+            or self._flush_wanted
+            or self._closed
+        )
+
+    def _replay_orphans(self):
+        # A worker that died and isn't restarted would otherwise leave the
+        # ticks its users already saw sitting in the journal.
+        try:
+            self.replayed += replay(self._journal.directory, self.backend, skip_owner=self._journal.owner)
+        except Exception:
+            traceback.print_exc(file=sys.stderr)
+        self._orphans_at = time.monotonic() + self.orphan_interval
+
+    def _run(self):
+        while True:
+            if time.monotonic() >= self._orphans_at:
+                self._replay_orphans()
+            with self._cond:
+                while not self._flush_due():
+                    if self._closed and not self._pending_count:
+                        return
+                    wake = self._orphans_at
+                    if self._pending_count:
+                        wake = min(wake, self._first_at + self.interval)
+                    if wake <= time.monotonic():
+                        break
+                    self._cond.wait(wake - time.monotonic())
+                if not self._flush_due():
+                    continue  # woke up to look for orphaned segments
+                batch, self._pending, self._pending_count = self._pending, {}, 0
+                programs, self._pending_programs = self._pending_programs, {}
+                loads, self._pending_loads = self._pending_loads, {}
+                self._inflight, self._inflight_loads = batch, loads
+                segment = self._journal.rotate()
+                self._cond.notify_all()
+
+            try:
+                for (user, program), rows in _rows_by_writer(batch, programs).items():
+                    self.backend.set_many(rows, program=program, user=user)
+                for (user, d_str, day), (blobs, at) in loads.items():
+                    self.backend.set_loads(d_str, day, *blobs, at=at, user=user)
+            except Exception as e:
+                traceback.print_exc(file=sys.stderr)
+                with self._cond:
+                    # Put the batch back underneath anything queued since and
+                    # keep its journal segment until a retry succeeds.
+                    for key, sets in self._pending.items():
+                        batch.setdefault(key, {}).update(sets)
+                    for key, program in self._pending_programs.items():
+                        programs.setdefault(key, program)
+                    loads.update(self._pending_loads)
+                    self._pending, self._pending_programs, self._pending_loads = batch, programs, loads
+                    self._pending_count = sum(len(sets) for sets in batch.values()) + len(loads)
+                    self._first_at = time.monotonic()
+                    self._inflight, self._inflight_loads = {}, {}
+                    self._failed.append(segment)
+                    self._error = e
+                    self._failures += 1
+                    self._cond.notify_all()
+                    if self._closed:
+                        return  # the journal replays it on the next start
+                time.sleep(self.interval)
+                continue
+
+            with self._cond:
+                self._inflight, self._inflight_loads = {}, {}
+                for old in (*self._failed, segment):
+                    Journal.discard(old)
+                self._failed.clear()
+                self._error = None
+                self._cond.notify_all()
+
+    def flush(self) -> None:
+        """Block until everything queued so far is in the backend."""
+        with self._cond:
+            self._flush_wanted = True
+            self._cond.notify_all()
+            failures = self._failures
+            try:
+                while self._pending_count or self._inflight or self._inflight_loads:
+                    if self._failures > failures:
+                        # The batch stays queued and is retried; don't hang
+                        # the caller on a backend that keeps failing. An
+                        # older failure may still be retried successfully.
+                        raise self._error
+                    self._cond.wait(self.interval)
+            finally:
+                self._flush_wanted = False
+
+    def import_rows(self, digest, rows, program=None, user=""):
+        self.flush()
+        return self.backend.import_rows(digest, rows, program=program, user=user)
+
+    def day_sets(self, d_str, day, user=""):
+        # Copy the overlay before reading the backend: a batch committed in
+        # between is then in both, never in neither.
+        with self._cond:
+            overlay = [
+                dict(changes[(user, d_str, day)])
+                for changes in (self._inflight, self._pending)
+                if (user, d_str, day) in changes
+            ]
+        sets = self.backend.day_sets(d_str, day, user=user)
+        for changes in overlay:
+            sets.update({key: done for key, (done, _) in changes.items()})
+        return sets
+
+    def items(self, user=""):
+        self.flush()
+        return self.backend.items(user=user)
+
+    def day_counts(self, user=""):
+        self.flush()
+        return self.backend.day_counts(user=user)
+
+    def sessions_between(self, start, end, user=""):
+        self.flush()
+        return self.backend.sessions_between(start, end, user=user)
+
+    def latest_session(self, day, before, user=""):
+        self.flush()
+        return self.backend.latest_session(day, before, user=user)
+
+    def exercise_counts(self, user=""):
+        self.flush()
+        return self.backend.exercise_counts(user=user)
+
+    def version(self, user=""):
+        # Queued writes count too, so caches keyed on the version go stale as
+        # soon as a change is accepted. Both terms only ever grow, so the sum
+        # changes whenever either does.
+        with self._cond:
+            queued = self._queued.get(user, 0)
+        return self.backend.version(user=user) + queued
+
+    def day_loads(self, d_str, day, user=""):
+        with self._cond:
+            for loads in (self._pending_loads, self._inflight_loads):
+                if (user, d_str, day) in loads:
+                    return loads[(user, d_str, day)][0]
+        return self.backend.day_loads(d_str, day, user=user)
+
+    def load_items(self, user=""):
+        self.flush()
+        return self.backend.load_items(user=user)
+
+    def has_import(self, digest, user=""):
+        return self.backend.has_import(digest, user=user)
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        with self._cond:
+            self._journal.close()
+        self.backend.close()